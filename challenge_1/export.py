@@ -0,0 +1,199 @@
+"""CPU export of the trained transliteration checkpoint and an accuracy-vs-latency report.
+
+    # dynamic int8 PyTorch weights
+    python export.py int8 --model-dir ./improved-banglish-bengali-model --output-dir ./export/int8
+    # ONNX Runtime model, plus int8-quantized graphs (needs optimum[onnxruntime])
+    python export.py onnx --model-dir ./improved-banglish-bengali-model --output-dir ./export/onnx
+    # CER / exact match and latency for fp32, int8 and ONNX, greedy and beam search
+    python export.py report --model-dir ./improved-banglish-bengali-model --export-dir ./export --data data.csv
+
+Every exported directory is loadable with `inference.load_model` or
+`BatchTransliterator(..., backend=...)`.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Dict, List
+import pandas as pd
+import torch
+from evaluate import load
+from transformers import MT5ForConditionalGeneration, T5Tokenizer
+from inference import (
+    ONNX_FILES,
+    QUANTIZED_WEIGHTS,
+    BatchTransliterator,
+    TextPreprocessor,
+    _latency_summary,
+    quantize_int8
+)
+
+logger = logging.getLogger(__name__)
+
+def export_int8(model_dir: str, output_dir: str):
+    """Save dynamically quantized int8 weights next to the config and tokenizer"""
+    model = MT5ForConditionalGeneration.from_pretrained(model_dir)
+    model.eval()
+    quantized = quantize_int8(model)
+
+    os.makedirs(output_dir, exist_ok=True)
+    model.config.save_pretrained(output_dir)
+    T5Tokenizer.from_pretrained(model_dir).save_pretrained(output_dir)
+    torch.save(quantized.state_dict(), os.path.join(output_dir, QUANTIZED_WEIGHTS))
+    logger.info(f"Saved int8 model to {output_dir}")
+
+def export_onnx(model_dir: str, output_dir: str, quantize: bool = True):
+    """Export encoder/decoder graphs to ONNX and optionally quantize them to int8"""
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    except ImportError as e:
+        raise ImportError("ONNX export requires `pip install optimum[onnxruntime]`") from e
+
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_dir, export=True)
+    model.save_pretrained(output_dir)
+    T5Tokenizer.from_pretrained(model_dir).save_pretrained(output_dir)
+    logger.info(f"Saved ONNX model to {output_dir}")
+
+    if not quantize:
+        return
+    # Dynamic quantization: int8 weights, activation ranges computed at run time
+    quantization_config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    for file_name in ONNX_FILES:
+        if os.path.exists(os.path.join(output_dir, file_name)):
+            quantizer = ORTQuantizer.from_pretrained(output_dir, file_name=file_name)
+            quantizer.quantize(quantization_config=quantization_config, save_dir=output_dir)
+    logger.info(f"Saved int8 ONNX graphs to {output_dir}")
+
+def _model_size_mb(path: str, backend: str) -> float:
+    """On-disk size of the weights a backend actually loads"""
+    if backend == "int8":
+        names = [QUANTIZED_WEIGHTS]
+    elif backend == "onnx":
+        names = list(ONNX_FILES)
+    elif backend == "onnx-int8":
+        names = [name.replace(".onnx", "_quantized.onnx") for name in ONNX_FILES]
+    else:
+        names = [name for name in os.listdir(path) if name.endswith((".safetensors", ".bin"))]
+    files = [os.path.join(path, name) for name in names]
+    return round(sum(os.path.getsize(f) for f in files if os.path.exists(f)) / 2**20, 1)
+
+def evaluate_backend(
+    transliterator: BatchTransliterator,
+    sources: List[str],
+    references: List[str],
+    cer_metric,
+    latency_samples: int = 50
+) -> Dict[str, float]:
+    """CER/exact match over `sources` plus batched throughput and single-text latency"""
+    transliterator.cache.clear()
+    start = time.perf_counter()
+    predictions = transliterator.transliterate_batch(sources)
+    elapsed = time.perf_counter() - start
+
+    latencies = []
+    for text in sources[:latency_samples]:
+        start = time.perf_counter()
+        transliterator.generate([TextPreprocessor.clean_text(text)])
+        latencies.append(time.perf_counter() - start)
+
+    references = [TextPreprocessor.clean_text(text) for text in references]
+    exact_matches = sum(p == r for p, r in zip(predictions, references))
+    return {
+        "cer": round(cer_metric.compute(predictions=predictions, references=references), 4),
+        "exact_match": round(exact_matches / len(references), 4),
+        "texts_per_second": round(len(sources) / elapsed, 2),
+        **_latency_summary(latencies)
+    }
+
+def report(
+    model_dir: str,
+    export_dir: str,
+    data_path: str,
+    samples: int = 500,
+    latency_samples: int = 50,
+    batch_size: int = 32,
+    word_level: bool = True
+) -> List[Dict]:
+    """Compare every available backend with greedy and 5-beam decoding"""
+    df = pd.read_csv(data_path).dropna()
+    df = df.sample(min(samples, len(df)), random_state=42)
+    sources, references = df["rm"].tolist(), df["bn"].tolist()
+    cer_metric = load("cer")
+
+    candidates = [
+        ("fp32", model_dir),
+        ("int8", os.path.join(export_dir, "int8")),
+        ("onnx", os.path.join(export_dir, "onnx")),
+        ("onnx-int8", os.path.join(export_dir, "onnx"))
+    ]
+    rows = []
+    for backend, path in candidates:
+        if not os.path.isdir(path):
+            logger.info(f"Skipping {backend}: {path} not found")
+            continue
+        try:
+            transliterator = BatchTransliterator(
+                path,
+                max_batch_size=batch_size,
+                word_level=word_level,
+                backend=backend,
+                device="cpu"
+            )
+        except (ImportError, OSError) as e:
+            logger.info(f"Skipping {backend}: {e}")
+            continue
+
+        for num_beams in (1, 5):
+            transliterator.num_beams = num_beams
+            result = evaluate_backend(transliterator, sources, references, cer_metric, latency_samples)
+            rows.append({
+                "backend": backend,
+                "decoding": "greedy" if num_beams == 1 else f"beam{num_beams}",
+                "size_mb": _model_size_mb(path, backend),
+                **result
+            })
+            logger.info(json.dumps(rows[-1]))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the transliteration model for CPU inference")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("int8", "onnx"):
+        export_parser = subparsers.add_parser(name)
+        export_parser.add_argument("--model-dir", default="./improved-banglish-bengali-model")
+        export_parser.add_argument("--output-dir", default=f"./export/{name}")
+        if name == "onnx":
+            export_parser.add_argument("--no-quantize", action="store_true")
+
+    report_parser = subparsers.add_parser("report")
+    report_parser.add_argument("--model-dir", default="./improved-banglish-bengali-model")
+    report_parser.add_argument("--export-dir", default="./export")
+    report_parser.add_argument("--data", default="data.csv")
+    report_parser.add_argument("--samples", type=int, default=500)
+    report_parser.add_argument("--latency-samples", type=int, default=50)
+    report_parser.add_argument("--batch-size", type=int, default=32)
+    report_parser.add_argument("--sentence-level", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "int8":
+        export_int8(args.model_dir, args.output_dir)
+    elif args.command == "onnx":
+        export_onnx(args.model_dir, args.output_dir, quantize=not args.no_quantize)
+    else:
+        rows = report(
+            args.model_dir,
+            args.export_dir,
+            args.data,
+            samples=args.samples,
+            latency_samples=args.latency_samples,
+            batch_size=args.batch_size,
+            word_level=not args.sentence_level
+        )
+        print(json.dumps(rows, indent=2))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
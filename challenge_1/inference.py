@@ -0,0 +1,432 @@
+"""Batched, cached inference for the Banglish -> Bengali transliteration model.
+
+Loads a checkpoint saved by `ImprovedBanglishBengaliTransliterator.train` in
+training_scrpt.ipynb and serves it with:
+
+- `BatchTransliterator.transliterate_batch`: one padded `generate` call per
+  batch instead of one per string, plus an LRU cache of word-level results
+- `MicroBatcher`: collects concurrent requests for a few milliseconds and
+  runs them as a single batch
+- an optional `lexicon.Lexicon` answering known words before the cache
+  and the model are consulted
+
+Run as a script to benchmark CPU throughput and latency over the dataset:
+
+    python inference.py --model-dir ./improved-banglish-bengali-model --data data.csv
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import queue
+import re
+import statistics
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+import pandas as pd
+import torch
+from transformers import MT5Config, MT5ForConditionalGeneration, T5Tokenizer
+
+if TYPE_CHECKING:
+    from lexicon import Lexicon
+
+logger = logging.getLogger(__name__)
+
+TASK_PREFIX = "transliterate Bengali: "
+
+# Model formats accepted by `load_model`; see export.py for producing them
+BACKENDS = ("fp32", "int8", "onnx", "onnx-int8")
+QUANTIZED_WEIGHTS = "pytorch_model_int8.pt"
+ONNX_FILES = ("encoder_model.onnx", "decoder_model.onnx", "decoder_with_past_model.onnx")
+
+class TextPreprocessor:
+    @staticmethod
+    def clean_text(text: str) -> str:
+        """Clean and normalize text the same way as during training"""
+        text = str(text).strip()
+        text = re.sub(r'\s+', ' ', text)  # Remove extra whitespace
+        text = text.lower()  # Convert to lowercase
+        return text
+
+def quantize_int8(model: MT5ForConditionalGeneration) -> MT5ForConditionalGeneration:
+    """Dynamic int8 quantization of every Linear layer (weights int8, activations fp32)"""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def load_model(model_dir: str, backend: str = "fp32", device: str = "cpu"):
+    """Load a checkpoint for inference in one of `BACKENDS`.
+
+    `int8` reads weights written by `export.py int8`, or quantizes a plain
+    fp32 checkpoint on load. The ONNX backends need `optimum[onnxruntime]`
+    and a directory written by `export.py onnx`.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    if backend != "fp32" and torch.device(device).type != "cpu":
+        raise ValueError(f"The {backend} backend only runs on CPU")
+
+    if backend.startswith("onnx"):
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError as e:
+            raise ImportError("ONNX backends require `pip install optimum[onnxruntime]`") from e
+
+        file_names = {}
+        if backend == "onnx-int8":
+            file_names = {
+                "encoder_file_name": "encoder_model_quantized.onnx",
+                "decoder_file_name": "decoder_model_quantized.onnx",
+                "decoder_with_past_file_name": "decoder_with_past_model_quantized.onnx"
+            }
+        return ORTModelForSeq2SeqLM.from_pretrained(model_dir, **file_names)
+
+    quantized_path = os.path.join(model_dir, QUANTIZED_WEIGHTS)
+    if backend == "int8" and os.path.exists(quantized_path):
+        # Rebuild the architecture, quantize it, then load the int8 weights
+        model = quantize_int8(MT5ForConditionalGeneration(MT5Config.from_pretrained(model_dir)))
+        model.load_state_dict(torch.load(quantized_path))
+    else:
+        model = MT5ForConditionalGeneration.from_pretrained(model_dir)
+        if backend == "int8":
+            model = quantize_int8(model)
+
+    model.to(device)
+    model.eval()
+    return model
+
+class LRUCache:
+    """Thread-safe LRU mapping with hit/miss counters"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+class BatchTransliterator:
+    """Batched, cached wrapper around a trained transliteration checkpoint.
+
+    With `word_level` (the default) inputs are split on whitespace and every
+    distinct word is transliterated once, so repeated Banglish vocabulary is
+    served from the cache and the model only sees short sequences. Words
+    found in `lexicon` never reach the cache or the model.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        max_length: int = 128,
+        num_beams: int = 5,
+        max_batch_size: int = 32,
+        cache_size: int = 100_000,
+        word_level: bool = True,
+        backend: str = "fp32",
+        lexicon: Optional["Lexicon"] = None,
+        device: Optional[str] = None
+    ):
+        if device is None:
+            device = "cuda" if torch.cuda.is_available() and backend == "fp32" else "cpu"
+        self.device = torch.device(device)
+        self.backend = backend
+        self.max_length = max_length
+        self.num_beams = num_beams
+        self.max_batch_size = max_batch_size
+        self.word_level = word_level
+        self.cache = LRUCache(cache_size)
+        self.lexicon = lexicon
+
+        self.tokenizer = T5Tokenizer.from_pretrained(model_dir)
+        self.model = load_model(model_dir, backend, device)
+        # One generate at a time: parallel calls only oversubscribe the CPU
+        self._generate_lock = threading.Lock()
+
+    def generate(self, texts: List[str]) -> List[str]:
+        """Run the model on cleaned texts, padded to the longest in the batch"""
+        inputs = self.tokenizer(
+            [TASK_PREFIX + text for text in texts],
+            padding="longest",
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="pt"
+        ).to(self.device)
+
+        with self._generate_lock, torch.inference_mode():
+            outputs = self.model.generate(
+                input_ids=inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                max_length=self.max_length,
+                num_beams=self.num_beams,
+                length_penalty=1.0,
+                early_stopping=True,
+                no_repeat_ngram_size=2,
+                do_sample=False
+            )
+
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+    def _split(self, text: str) -> List[str]:
+        text = TextPreprocessor.clean_text(text)
+        if self.word_level:
+            return text.split(" ") if text else []
+        return [text] if text else []
+
+    def transliterate_batch(self, texts: Sequence[str]) -> List[str]:
+        """Transliterate many texts with as few `generate` calls as possible"""
+        units = [self._split(text) for text in texts]
+
+        results: Dict[str, str] = {}
+        misses = []
+        occurrences = Counter(u for text_units in units for u in text_units)
+        for unit, count in occurrences.items():
+            if self.lexicon is not None:
+                known = self.lexicon.lookup(unit, count)
+                if known is not None:
+                    results[unit] = known
+                    continue
+            cached = self.cache.get(unit)
+            if cached is None:
+                misses.append(unit)
+            else:
+                results[unit] = cached
+
+        # Length-sorted chunks keep padding inside each batch to a minimum
+        misses.sort(key=len)
+        for start in range(0, len(misses), self.max_batch_size):
+            chunk = misses[start:start + self.max_batch_size]
+            for unit, output in zip(chunk, self.generate(chunk)):
+                results[unit] = output
+                self.cache.set(unit, output)
+
+        return [" ".join(results[unit] for unit in text_units) for text_units in units]
+
+    def transliterate(self, text: str) -> str:
+        return self.transliterate_batch([text])[0]
+
+    def stats(self) -> Dict[str, dict]:
+        stats = {"cache": self.cache.stats()}
+        if self.lexicon is not None:
+            stats["lexicon"] = self.lexicon.stats()
+        return stats
+
+class MicroBatcher:
+    """Coalesces concurrent `transliterate` calls into shared batches.
+
+    A background thread takes the first waiting request, keeps collecting
+    for up to `max_wait_ms` or until `max_batch_size` requests arrived, and
+    answers all of them with one `transliterate_batch` call.
+    """
+
+    def __init__(
+        self,
+        transliterator: BatchTransliterator,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0
+    ):
+        self.transliterator = transliterator
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def transliterate(self, text: str, timeout: Optional[float] = None) -> str:
+        return self.submit(text).result(timeout)
+
+    async def atransliterate(self, text: str) -> str:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then let _run see the sentinel
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            # Callers that were cancelled while waiting are dropped; the rest
+            # can no longer be cancelled, so setting their result cannot fail
+            batch = [
+                (text, future) for text, future in self._collect(item)
+                if future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            try:
+                outputs = self.transliterator.transliterate_batch([text for text, _ in batch])
+            except Exception as e:
+                outputs = [e] * len(batch)
+            for (_, future), output in zip(batch, outputs):
+                try:
+                    if isinstance(output, Exception):
+                        future.set_exception(output)
+                    else:
+                        future.set_result(output)
+                except Exception:
+                    # Never let one future take the thread, and every later caller, down
+                    logger.exception("Could not deliver a micro-batch result")
+
+def _latency_summary(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1] * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2)
+    }
+
+def benchmark(
+    transliterator: BatchTransliterator,
+    texts: List[str],
+    baseline_samples: int = 50,
+    concurrency: int = 16,
+    max_wait_ms: float = 5.0
+) -> Dict[str, dict]:
+    """Compare one-at-a-time generation with batched, cached and micro-batched serving"""
+    report = {}
+
+    # Baseline: the notebook's transliterate, one uncached string per generate
+    sample = texts[:baseline_samples]
+    latencies = []
+    for text in sample:
+        start = time.perf_counter()
+        transliterator.generate([TextPreprocessor.clean_text(text)])
+        latencies.append(time.perf_counter() - start)
+    report["sequential"] = {
+        "texts": len(sample),
+        "texts_per_second": round(len(sample) / sum(latencies), 2),
+        **_latency_summary(latencies)
+    }
+
+    for label in ("batch_cold_cache", "batch_warm_cache"):
+        start = time.perf_counter()
+        transliterator.transliterate_batch(texts)
+        elapsed = time.perf_counter() - start
+        report[label] = {
+            "texts": len(texts),
+            "texts_per_second": round(len(texts) / elapsed, 2),
+            **transliterator.stats()
+        }
+
+    # Micro-batching under concurrent single-text requests, cold cache
+    transliterator.cache = LRUCache(transliterator.cache.maxsize)
+    batcher = MicroBatcher(transliterator, transliterator.max_batch_size, max_wait_ms)
+
+    def timed(text: str) -> float:
+        start = time.perf_counter()
+        batcher.transliterate(text)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, texts))
+    elapsed = time.perf_counter() - start
+    batcher.close()
+    report["micro_batched"] = {
+        "texts": len(texts),
+        "concurrency": concurrency,
+        "texts_per_second": round(len(texts) / elapsed, 2),
+        **_latency_summary(latencies),
+        **transliterator.stats()
+    }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transliteration serving on CPU")
+    parser.add_argument("--model-dir", default="./improved-banglish-bengali-model")
+    parser.add_argument("--data", default="data.csv")
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--baseline-samples", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--num-beams", type=int, default=5)
+    parser.add_argument("--backend", choices=BACKENDS, default="fp32")
+    parser.add_argument("--lexicon", help="lexicon.json written by lexicon.py")
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data).dropna()
+    texts = df["rm"].sample(min(args.samples, len(df)), random_state=42).tolist()
+
+    lexicon = None
+    if args.lexicon:
+        from lexicon import Lexicon
+        lexicon = Lexicon.load(args.lexicon)
+
+    transliterator = BatchTransliterator(
+        args.model_dir,
+        num_beams=args.num_beams,
+        max_batch_size=args.batch_size,
+        backend=args.backend,
+        lexicon=lexicon,
+        device=args.device
+    )
+    report = benchmark(
+        transliterator,
+        texts,
+        baseline_samples=args.baseline_samples,
+        concurrency=args.concurrency,
+        max_wait_ms=args.max_wait_ms
+    )
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
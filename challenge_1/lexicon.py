@@ -0,0 +1,142 @@
+"""Dictionary fast path in front of the neural transliterator.
+
+A hash lexicon from cleaned Banglish to Bengali, built from the training
+pairs. Whole texts are indexed, and so are individual words wherever a pair
+has the same number of words on both sides. `BatchTransliterator` consults
+it per token, so only out-of-vocabulary words reach the model.
+
+    # build from the dataset, measuring coverage on a held-out 10%
+    python lexicon.py --data data.csv --output lexicon.json
+"""
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from inference import TextPreprocessor
+
+logger = logging.getLogger(__name__)
+
+# Leading punctuation, word, trailing punctuation ("(ami," -> "(", "ami", ",")
+_AFFIXES = re.compile(r"^(\W*)(.*?)(\W*)$")
+
+class Lexicon:
+    """Exact-match Banglish -> Bengali lookup with hit/miss counters"""
+
+    def __init__(self, entries: Dict[str, str]):
+        self._entries = entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Tuple[str, str]], min_count: int = 1) -> "Lexicon":
+        """Keep the most frequent Bengali form seen for each text and word"""
+        counts: Dict[str, Counter] = defaultdict(Counter)
+        for source, target in pairs:
+            source = TextPreprocessor.clean_text(source)
+            target = " ".join(str(target).split())
+            if not source or not target:
+                continue
+            counts[source][target] += 1
+            source_words, target_words = source.split(" "), target.split(" ")
+            if len(source_words) > 1 and len(source_words) == len(target_words):
+                for source_word, target_word in zip(source_words, target_words):
+                    counts[source_word][target_word] += 1
+
+        entries = {}
+        for source, targets in counts.items():
+            target, count = targets.most_common(1)[0]
+            if count >= min_count:
+                entries[source] = target
+        return cls(entries)
+
+    @classmethod
+    def from_csv(cls, path: str, min_count: int = 1) -> "Lexicon":
+        df = pd.read_csv(path).dropna()
+        return cls.from_pairs(zip(df["rm"], df["bn"]), min_count)
+
+    @classmethod
+    def load(cls, path: str) -> "Lexicon":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, token: str, occurrences: int = 1) -> Optional[str]:
+        """Bengali form of a cleaned token, or None when it is out of vocabulary.
+
+        Surrounding punctuation is kept as-is around the transliterated word.
+        `occurrences` is how many input tokens this lookup answers, for stats.
+        """
+        value = self._entries.get(token)
+        if value is None:
+            prefix, word, suffix = _AFFIXES.match(token).groups()
+            if word and (prefix or suffix):
+                value = self._entries.get(word)
+                if value is not None:
+                    value = prefix + value + suffix
+
+        with self._lock:
+            if value is None:
+                self.misses += occurrences
+            else:
+                self.hits += occurrences
+        return value
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the transliteration lexicon")
+    parser.add_argument("--data", default="data.csv")
+    parser.add_argument("--output", default="lexicon.json")
+    parser.add_argument("--min-count", type=int, default=1)
+    parser.add_argument("--test-size", type=float, default=0.1)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data).dropna()
+    train, test = train_test_split(df, test_size=args.test_size, random_state=42)
+
+    # Coverage and accuracy on pairs the lexicon was not built from
+    held_out = Lexicon.from_pairs(zip(train["rm"], train["bn"]), args.min_count)
+    correct = answered = 0
+    start = time.perf_counter()
+    for source, target in zip(test["rm"], test["bn"]):
+        tokens = TextPreprocessor.clean_text(source).split(" ")
+        outputs = [held_out.lookup(token) for token in tokens]
+        if all(output is not None for output in outputs):
+            answered += 1
+            correct += " ".join(outputs) == " ".join(str(target).split())
+    elapsed = time.perf_counter() - start
+    lookups = held_out.hits + held_out.misses
+
+    lexicon = Lexicon.from_pairs(zip(df["rm"], df["bn"]), args.min_count)
+    lexicon.save(args.output)
+    print(json.dumps({
+        "entries": len(lexicon),
+        "held_out_token_hit_ratio": round(held_out.stats()["hit_ratio"], 4),
+        "held_out_texts_fully_answered": round(answered / len(test), 4),
+        "held_out_accuracy_when_answered": round(correct / answered, 4) if answered else 0.0,
+        "lookup_us": round(elapsed / max(lookups, 1) * 1e6, 2)
+    }, indent=2))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,25 +1,54 @@
+from functools import lru_cache
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .utils.config import get_settings
 
-settings = get_settings()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+Base = declarative_base()
 
-engine = create_engine(
-    settings.database_url,
-    pool_size=10,
-    max_overflow=2,
-    pool_timeout=30,
-    pool_recycle=1800,
-    connect_args={"sslmode": "require"}
-)
+@lru_cache
+def get_engine() -> Engine:
+    """Pooled engine for direct Postgres access, created on first use so
+    workers that never query Postgres directly do not build a pool"""
+    settings = get_settings()
+    return create_engine(
+        settings.database_url,
+        pool_size=10,
+        max_overflow=2,
+        pool_timeout=30,
+        pool_recycle=1800,
+        connect_args={"sslmode": settings.database_sslmode}
+    )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    """The same pool settings over asyncpg, for the "postgres" recipe backend"""
+    settings = get_settings()
+    return create_async_engine(
+        make_url(settings.database_url).set(drivername="postgresql+asyncpg"),
+        pool_size=10,
+        max_overflow=2,
+        pool_timeout=30,
+        pool_recycle=1800,
+        connect_args={
+            "ssl": settings.database_sslmode,
+            # SQLAlchemy's statement cache, then asyncpg's own
+            "prepared_statement_cache_size": settings.database_statement_cache_size,
+            "statement_cache_size": settings.database_statement_cache_size
+        }
+    )
+
+async def dispose_async_engine():
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+        get_async_engine.cache_clear()
 
 def get_db():
-    db = SessionLocal()
+    db = SessionLocal(bind=get_engine())
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
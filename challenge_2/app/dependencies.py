@@ -0,0 +1,18 @@
+"""Providers for FastAPI `Depends`.
+
+Endpoints get their services and the acting user from these instead of
+module globals, so a deployment or a test can swap them through
+`app.dependency_overrides`. `get_recipe_service` picks the PostgREST or
+direct Postgres implementation according to `recipe_backend`.
+"""
+from fastapi import Depends
+from .services.image_jobs import ImageJobQueue, image_jobs
+from .services.recipe_service import get_recipe_service
+from .utils.config import Settings, get_settings
+
+def get_image_jobs() -> ImageJobQueue:
+    return image_jobs
+
+def get_current_user_id(settings: Settings = Depends(get_settings)) -> str:
+    """Owner of the data a request touches; a fixed user until authentication is added"""
+    return settings.default_user_id
@@ -1,19 +1,51 @@
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Header
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from .models.schemas import RecipeCreate, IngredientCreate, ChatRequest, Recipe, Ingredient
-from .services.recipe_service import recipe_service
-from .services.langchain_service import langchain_service
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from .models.schemas import (
+    RecipeCreate, IngredientCreate, ChatRequest, Recipe, Ingredient, RecipeMatch,
+    RecipeBatchResult, RecipeSummary, ImageJob, ExpiringIngredient, ExpiryMatch
+)
+from .services.recipe_service import RecipeService, warm_up_langchain_service
+from .services.supabase_client import get_supabase, close_supabase
+from .services.cache import inventory_cache, suggestion_cache
+from .services.image_jobs import ImageJobQueue, QueueFullError, image_jobs
+from .dependencies import get_current_user_id, get_image_jobs, get_recipe_service
 from .utils.config import get_settings
-from typing import List
+from .utils.responses import NDJSON, ModelResponse, ndjson_pages
+from .utils.uploads import UploadLimitMiddleware, spool_upload
+from .utils import metrics
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator, List, Optional, Tuple, Union
+from datetime import datetime
+from pydantic import ValidationError
 from jose import jwt
-from PIL import Image
-import io
+import asyncio
+import json
 import logging
 
 # Add at the top of main.py
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients are created per worker at startup rather than at import. The
+    # LLM chains are built off the event loop because langchain alone takes
+    # seconds to import; requests that need them before then wait for it.
+    get_supabase()
+    llm_warmup = warm_up_langchain_service()
+    image_jobs.start()
+    yield
+    try:
+        await image_jobs.stop()
+        # A failed warmup was already reported to the requests that needed it
+        with suppress(Exception):
+            await asyncio.wrap_future(llm_warmup)
+    finally:
+        await get_recipe_service().close()
+        close_supabase()
+
 app = FastAPI(
     title="Mofa's Kitchen Buddy",
     description="""
@@ -29,9 +61,14 @@ app = FastAPI(
     """,
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
+# Refuse oversized photos before their body is read. Added before CORS so
+# the 413 still carries CORS headers
+app.add_middleware(UploadLimitMiddleware, limits={"/recipes/image": get_settings().image_max_bytes})
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -39,114 +76,353 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
+
+# Added last so it wraps everything, CORS included
+app.add_middleware(
+    metrics.MetricsMiddleware,
+    server_timing=get_settings().metrics_server_timing
 )
 
 # Recipe endpoints
 @app.post("/recipes/", response_model=Recipe, tags=["Recipes"])
-async def create_recipe(recipe: RecipeCreate):
+async def create_recipe(
+    recipe: RecipeCreate,
+    recipe_service: RecipeService = Depends(get_recipe_service),
+    user_id: str = Depends(get_current_user_id)
+):
     """Create a new recipe"""
     try:
-        return await recipe_service.create_recipe(recipe, "test_user")
+        return await recipe_service.create_recipe(recipe, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/recipes/match", response_model=List[RecipeMatch], tags=["Recipes"])
+async def match_recipes(
+    limit: int = Query(10, ge=1, le=100),
+    min_coverage: float = Query(0.0, ge=0.0, le=1.0),
+    recipe_service: RecipeService = Depends(get_recipe_service),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Rank stored recipes by how much of them the current pantry covers"""
+    try:
+        return await recipe_service.match_recipes(user_id, limit, min_coverage)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/recipes/use-soon", response_model=List[ExpiryMatch], tags=["Recipes"])
+async def use_soon_recipes(
+    within_days: float = Query(get_settings().expiry_horizon_days, ge=0, le=365),
+    limit: int = Query(10, ge=1, le=100),
+    recipe_service: RecipeService = Depends(get_recipe_service),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Rank stored recipes by how much soon-to-expire stock they use up"""
+    try:
+        return await recipe_service.rank_by_expiry(user_id, within_days, limit)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/recipes/{recipe_id}", response_model=Recipe, tags=["Recipes"])
-async def get_recipe(recipe_id: int):
+async def get_recipe(
+    recipe_id: int,
+    recipe_service: RecipeService = Depends(get_recipe_service),
+    user_id: str = Depends(get_current_user_id)
+):
     """Get a specific recipe by ID"""
     try:
-        recipe = await recipe_service.get_recipe(recipe_id, "test_user")
+        recipe = await recipe_service.get_recipe(recipe_id, user_id)
         if not recipe:
             raise HTTPException(status_code=404, detail="Recipe not found")
         return recipe
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/recipes/", response_model=List[Recipe], tags=["Recipes"])
-async def get_recipes():
-    """Get all recipes for the current user"""
+def _page_response(request: Request, items: list, limit: int, fetch, exclude_unset: bool = False) -> Response:
+    """One page as JSON, or with `Accept: application/x-ndjson` every page from it on.
+
+    JSON carries the keyset cursor for the next page, if there may be one.
+    NDJSON streams one row per line, calling `fetch(cursor)` for each further
+    page of `limit` rows. `exclude_unset` must match the route's
+    response_model_exclude_unset.
+    """
+    if "ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(ndjson_pages(items, fetch, limit, exclude_unset), media_type=NDJSON)
+    response = ModelResponse(items, exclude_unset=exclude_unset)
+    if len(items) == limit:
+        response.headers["X-Next-Cursor"] = str(items[-1].id)
+    return response
+
+@app.get(
+    "/recipes/",
+    response_model=List[Union[Recipe, RecipeSummary]],
+    response_model_exclude_unset=True,
+    tags=["Recipes"]
+)
+async def get_recipes(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[int] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    cuisine_type: Optional[str] = None,
+    difficulty_level: Optional[str] = None,
+    is_vegetarian: Optional[bool] = None,
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated fields to return, e.g. name,cuisine_type,cooking_time"
+    ),
+    recipe_service: RecipeService = Depends(get_recipe_service),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Get the current user's recipes, one page at a time, or all of them as NDJSON"""
     try:
-        return await recipe_service.get_recipes("test_user")
+        field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+        def fetch(cursor: Optional[int]):
+            return recipe_service.get_recipes(
+                user_id,
+                limit=limit,
+                cursor=cursor,
+                cuisine_type=cuisine_type,
+                difficulty_level=difficulty_level,
+                is_vegetarian=is_vegetarian,
+                fields=field_list
+            )
+
+        return _page_response(request, await fetch(cursor), limit, fetch, exclude_unset=True)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.put("/recipes/{recipe_id}", response_model=Recipe, tags=["Recipes"])
-async def update_recipe(recipe_id: int, recipe: RecipeCreate):
+async def update_recipe(
+    recipe_id: int,
+    recipe: RecipeCreate,
+    recipe_service: RecipeService = Depends(get_recipe_service),
+    user_id: str = Depends(get_current_user_id)
+):
     """Update a specific recipe"""
     try:
-        return await recipe_service.update_recipe(recipe_id, recipe, "test_user")
+        return await recipe_service.update_recipe(recipe_id, recipe, user_id)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.delete("/recipes/{recipe_id}", tags=["Recipes"])
-async def delete_recipe(recipe_id: int):
+async def delete_recipe(
+    recipe_id: int,
+    recipe_service: RecipeService = Depends(get_recipe_service),
+    user_id: str = Depends(get_current_user_id)
+):
     """Delete a specific recipe"""
     try:
-        return await recipe_service.delete_recipe(recipe_id, "test_user")
+        return await recipe_service.delete_recipe(recipe_id, user_id)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/recipes/image", response_model=Recipe, tags=["Recipes"])
-async def create_recipe_from_image(file: UploadFile = File(...)):
-    """Create a recipe from an image"""
+@app.post("/recipes/image", response_model=ImageJob, status_code=202, tags=["Recipes"])
+async def create_recipe_from_image(
+    file: UploadFile = File(...),
+    user_id: str = Depends(get_current_user_id),
+    jobs: ImageJobQueue = Depends(get_image_jobs)
+):
+    """Queue a recipe photo for extraction.
+
+    Returns a job immediately; poll `/recipes/image/jobs/{job_id}` for the
+    parsed and saved recipe. Uploading the same photo again returns the job
+    of the first upload.
+    """
     try:
-        # Read and process image
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        
-        # Extract text from image using LangChain
-        recipe = langchain_service.parse_recipe_from_image(image)
-        
-        # Save recipe
-        return await recipe_service.create_recipe(recipe, "test_user")
+        path, digest = await run_in_threadpool(spool_upload, file.file, get_settings().image_spool_dir)
+        return jobs.submit(path, digest, user_id)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/recipes/image/jobs/{job_id}", response_model=ImageJob, tags=["Recipes"])
+async def get_image_job(job_id: str, jobs: ImageJobQueue = Depends(get_image_jobs)):
+    """Get the status, and once completed the recipe, of an image job"""
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+def _parse_batch_item(raw) -> Union[RecipeCreate, str]:
+    try:
+        if isinstance(raw, (bytes, str)):
+            raw = json.loads(raw)
+        return RecipeCreate.parse_obj(raw)
+    except (ValueError, ValidationError) as e:
+        return str(e)
+
+async def _batch_items(request: Request) -> AsyncIterator[Tuple[int, Union[RecipeCreate, str]]]:
+    """Yield (position, recipe or parse error) from a JSON array or NDJSON body"""
+    if "ndjson" in request.headers.get("content-type", ""):
+        # Parse line by line as the body arrives so inserts overlap the upload
+        index, buffer = 0, b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, _parse_batch_item(line)
+                    index += 1
+        if buffer.strip():
+            yield index, _parse_batch_item(buffer)
+        return
+    
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array of recipes")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array of recipes")
+    for index, raw in enumerate(payload):
+        yield index, _parse_batch_item(raw)
+
+@app.post("/recipes/batch", response_model=RecipeBatchResult, tags=["Recipes"])
+async def create_recipes_batch(
+    request: Request,
+    recipe_service: RecipeService = Depends(get_recipe_service),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Import many recipes at once.
+
+    Send a JSON array of recipes, or one recipe per line with
+    `Content-Type: application/x-ndjson`. Recipes are inserted in bulk and
+    failures are reported per item by their position in the batch.
+    """
+    try:
+        return await recipe_service.create_recipes(_batch_items(request), user_id)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # Ingredient endpoints
 @app.post("/ingredients/", response_model=Ingredient, tags=["Ingredients"])
-async def create_ingredient(ingredient: IngredientCreate):
+async def create_ingredient(
+    ingredient: IngredientCreate,
+    recipe_service: RecipeService = Depends(get_recipe_service),
+    user_id: str = Depends(get_current_user_id)
+):
     """Add a new ingredient"""
     try:
-        return await recipe_service.add_ingredient(ingredient, "test_user")
+        return await recipe_service.add_ingredient(ingredient, user_id)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/ingredients/", response_model=List[Ingredient], tags=["Ingredients"])
-async def get_ingredients():
-    """Get all ingredients for the current user"""
+async def get_ingredients(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[int] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    category: Optional[str] = None,
+    expiring_before: Optional[datetime] = None,
+    recipe_service: RecipeService = Depends(get_recipe_service),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Get the current user's ingredients, one page at a time, or all of them as NDJSON"""
     try:
-        return await recipe_service.get_ingredients("test_user")
+        def fetch(cursor: Optional[int]):
+            return recipe_service.get_ingredients(
+                user_id,
+                limit=limit,
+                cursor=cursor,
+                category=category,
+                expiring_before=expiring_before
+            )
+
+        return _page_response(request, await fetch(cursor), limit, fetch)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/ingredients/expiring", response_model=List[ExpiringIngredient], tags=["Ingredients"])
+async def get_expiring_ingredients(
+    within_days: float = Query(get_settings().expiry_horizon_days, ge=0, le=365),
+    recipe_service: RecipeService = Depends(get_recipe_service),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Ingredients that expire within `within_days`, soonest first, expired ones included"""
+    try:
+        return await recipe_service.get_expiring_ingredients(user_id, within_days)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.put("/ingredients/{ingredient_id}", response_model=Ingredient, tags=["Ingredients"])
-async def update_ingredient(ingredient_id: int, ingredient: IngredientCreate):
+async def update_ingredient(
+    ingredient_id: int,
+    ingredient: IngredientCreate,
+    recipe_service: RecipeService = Depends(get_recipe_service),
+    user_id: str = Depends(get_current_user_id)
+):
     """Update an ingredient"""
     try:
-        return await recipe_service.update_ingredient(ingredient_id, ingredient, "test_user")
+        return await recipe_service.update_ingredient(ingredient_id, ingredient, user_id)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.delete("/ingredients/{ingredient_id}", tags=["Ingredients"])
-async def delete_ingredient(ingredient_id: int):
+async def delete_ingredient(
+    ingredient_id: int,
+    recipe_service: RecipeService = Depends(get_recipe_service),
+    user_id: str = Depends(get_current_user_id)
+):
     """Delete a specific ingredient"""
     try:
-        return await recipe_service.delete_ingredient(ingredient_id, "test_user")
+        return await recipe_service.delete_ingredient(ingredient_id, user_id)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+def _sse(event: str, data: dict) -> str:
+    """Format a single Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _stream_chat(recipe_service: RecipeService, message: str, user_id: str):
+    try:
+        async for token in recipe_service.stream_recipe_suggestions(message, user_id):
+            yield _sse("token", {"token": token})
+        yield _sse("done", {})
+    except Exception as e:
+        # Headers are already sent, so errors are reported in-band
+        logger.exception("Error while streaming chat response")
+        yield _sse("error", {"detail": str(e)})
+
 @app.post("/chat/", tags=["Chat"])
-async def chat(request: ChatRequest):
-    """Chat with the recipe assistant"""
+async def chat(
+    request: ChatRequest,
+    recipe_service: RecipeService = Depends(get_recipe_service),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Chat with the recipe assistant.
+
+    Set `stream` to receive the answer as Server-Sent Events (`token` events
+    followed by `done`) while the model is still generating.
+    """
     try:
         logger.info(f"Received message: {request.message}")
         
         if not request.message:
             raise HTTPException(status_code=400, detail="Message cannot be empty")
         
+        if request.stream:
+            return StreamingResponse(
+                _stream_chat(recipe_service, request.message, user_id),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
         try:
             logger.info("Calling recipe_service.get_recipe_suggestions")
-            response = await recipe_service.get_recipe_suggestions(request.message, "test_user")
-            logger.info(f"Got response from service: {response}")
+            response = await recipe_service.get_recipe_suggestions(request.message, user_id)
+            logger.info(f"Got response from service ({len(response or '')} chars)")
         except Exception as service_error:
             logger.error(f"Service error: {str(service_error)}")
             raise HTTPException(status_code=500, detail=f"Service error: {str(service_error)}")
@@ -165,6 +441,16 @@ async def health_check():
     """Check if the system is running"""
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    """Request, backing-service and LLM token metrics in Prometheus format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats", tags=["System"])
+async def cache_stats():
+    """Hit/miss counters for the recipe suggestion and pantry caches"""
+    return {"suggestions": suggestion_cache.stats(), "inventory": inventory_cache.stats()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -34,10 +34,19 @@ class RecipeBase(BaseModel):
     taste_profile: Optional[str] = None
     instructions: str
     ingredients: List[RecipeIngredientBase]
+    is_vegetarian: Optional[bool] = None
 
 class RecipeCreate(RecipeBase):
     pass
 
+class RecipeDetails(BaseModel):
+    """Descriptive recipe fields an LLM can estimate when the source omits them"""
+    cuisine_type: Optional[str] = None
+    preparation_time: Optional[int] = None
+    cooking_time: Optional[int] = None
+    difficulty_level: Optional[str] = None
+    taste_profile: Optional[str] = None
+
 class Recipe(RecipeBase):
     id: int
     user_id: UUID4
@@ -49,8 +58,79 @@ class Recipe(RecipeBase):
     class Config:
         from_attributes = True
 
+class RecipeSummary(BaseModel):
+    """A recipe restricted to the fields a list view asked for"""
+    id: int
+    name: Optional[str] = None
+    cuisine_type: Optional[str] = None
+    preparation_time: Optional[int] = None
+    cooking_time: Optional[int] = None
+    difficulty_level: Optional[str] = None
+    taste_profile: Optional[str] = None
+    instructions: Optional[str] = None
+    ingredients: Optional[List[RecipeIngredientBase]] = None
+    is_vegetarian: Optional[bool] = None
+    user_id: Optional[UUID4] = None
+    average_rating: Optional[float] = None
+    number_of_reviews: Optional[int] = None
+    vector_store_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class RecipeBatchError(BaseModel):
+    # Zero-based position of the item in the submitted batch
+    index: int
+    detail: str
+
+class RecipeBatchResult(BaseModel):
+    created: int
+    failed: int
+    recipe_ids: List[int]
+    errors: List[RecipeBatchError]
+    elapsed_seconds: float
+    recipes_per_second: float
+
+class RecipeMatch(BaseModel):
+    recipe_id: int
+    name: str
+    # Share of the recipe's ingredients present in the pantry
+    coverage: float
+    # Share present in at least the required quantity
+    sufficient_coverage: float
+    matched_ingredients: List[str]
+    missing_ingredients: List[str]
+    insufficient_ingredients: List[str]
+
+class ExpiringIngredient(BaseModel):
+    id: int
+    name: str
+    quantity: float
+    unit: str
+    category: Optional[str] = None
+    expiry_date: datetime
+    # Negative once the expiry date has passed
+    days_left: float
+
+class ExpiryMatch(BaseModel):
+    recipe_id: int
+    name: str
+    # Urgency-weighted share of the near-expiry stock the recipe uses up
+    score: float
+    # Near-expiry pantry items the recipe uses, most urgent first
+    expiring_ingredients: List[str]
+    missing_ingredients: List[str]
+
+class ImageJob(BaseModel):
+    id: str
+    # queued -> processing -> completed | failed
+    status: str
+    created_at: datetime
+    recipe: Optional[Recipe] = None
+    error: Optional[str] = None
+
 class ChatRequest(BaseModel):
     message: str
+    # Stream the answer as Server-Sent Events instead of a single JSON body
+    stream: bool = False
 
 class ChatResponse(BaseModel):
     response: str
\ No newline at end of file
@@ -0,0 +1,265 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple, Union
+import hashlib
+import re
+import sys
+import threading
+import time
+from pydantic.datetime_parse import parse_datetime
+from ..utils.config import get_settings
+from ..utils import metrics
+
+settings = get_settings()
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire after `ttl` seconds"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def update(self, key: Hashable, function: Callable[[Any], Any]) -> bool:
+        """Replace a live entry's value with `function(value)`, keeping its expiry"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return False
+            self._data[key] = (entry[0], function(entry[1]))
+            return True
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def values(self) -> List[Any]:
+        with self._lock:
+            return [value for _, value in self._data.values()]
+
+    def discard_where(self, predicate) -> int:
+        """Drop every entry whose key matches `predicate`, return how many"""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+def normalize_query(query: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    query = re.sub(r"[^\w\s]", " ", query.lower())
+    return " ".join(query.split())
+
+def inventory_hash(ingredient_names: Iterable[str]) -> str:
+    """Order-independent fingerprint of a user's pantry"""
+    names = sorted({name.strip().lower() for name in ingredient_names})
+    return hashlib.sha1("\n".join(names).encode()).hexdigest()
+
+class SuggestionCache:
+    """Caches LLM recipe suggestions per (user, normalized query, pantry).
+
+    Keys embed a hash of the ingredient list, so an answer is never served
+    for a different pantry; `invalidate_user` additionally frees entries as
+    soon as the inventory is mutated instead of waiting for them to expire.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize, ttl)
+
+    @staticmethod
+    def key(user_id: str, query: str, ingredient_names: Iterable[str]) -> Tuple[str, str, str]:
+        return (user_id, normalize_query(query), inventory_hash(ingredient_names))
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: Tuple[str, str, str], response: str):
+        self._cache.set(key, response)
+
+    def invalidate_user(self, user_id: str) -> int:
+        return self._cache.discard_where(lambda key: key[0] == user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        # Every hit is one LLM completion that was not paid for
+        return {**self._cache.stats(), "llm_calls_saved": self._cache.hits}
+
+# Create singleton instance
+suggestion_cache = SuggestionCache(
+    maxsize=settings.suggestion_cache_size,
+    ttl=settings.suggestion_cache_ttl
+)
+
+def _timestamp(value: Union[None, str, datetime]) -> Optional[float]:
+    """Unix timestamp of a datetime or ISO 8601 string; naive values are UTC"""
+    if value is None:
+        return None
+    value = parse_datetime(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+# Columns of the `ingredients` table a PantryItem is built from
+PANTRY_COLUMNS = ("id", "name", "quantity", "unit", "category", "expiry_date")
+
+class PantryItem(NamedTuple):
+    """The part of an ingredient row that chat and matching read"""
+    id: int
+    name: str
+    quantity: float
+    unit: str
+    category: Optional[str]
+    # Unix timestamp; a float is a third the size of a datetime
+    expires_at: Optional[float]
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "PantryItem":
+        """From an `ingredients` row, as PostgREST or SQLAlchemy return it"""
+        return cls(
+            row["id"], row["name"], row["quantity"] or 0.0, row["unit"],
+            row.get("category"), _timestamp(row.get("expiry_date"))
+        )
+
+    @property
+    def expiry_date(self) -> Optional[datetime]:
+        if self.expires_at is None:
+            return None
+        return datetime.fromtimestamp(self.expires_at, timezone.utc)
+
+Pantry = Tuple[PantryItem, ...]
+
+def _expiry_order(item: PantryItem) -> Tuple[bool, float, int]:
+    return (item.expires_at is None, item.expires_at or 0.0, item.id)
+
+def make_pantry(items: Iterable[PantryItem]) -> Pantry:
+    """A pantry snapshot: items ordered by expiry date, undated ones last.
+
+    The order doubles as an expiry index, since whatever expires within a
+    given horizon is a prefix of the snapshot (see `expiry.expiring`).
+    """
+    return tuple(sorted(items, key=_expiry_order))
+
+def _pantry_size(pantry: Pantry) -> int:
+    """Bytes held by a cached pantry, counting each distinct object once"""
+    seen = set()
+    total = 0
+    for obj in (pantry, *pantry, *(field for item in pantry for field in item)):
+        if id(obj) not in seen:
+            seen.add(id(obj))
+            total += sys.getsizeof(obj)
+    return total
+
+class InventoryCache:
+    """Per-user pantry snapshots, kept current by the ingredient writes.
+
+    A snapshot is an immutable, expiry-ordered tuple of `PantryItem`s that
+    writes replace rather than mutate, so readers never see a half-applied
+    change. A fill that raced a write is dropped, since its rows may predate
+    the write.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        # user id -> (pantry, its size in bytes)
+        self._cache = TTLCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        self._version = 0
+        self.write_throughs = 0
+
+    @property
+    def version(self) -> int:
+        """Take before reading the database; pass to `fill` afterwards"""
+        return self._version
+
+    def get(self, user_id: str) -> Optional[Pantry]:
+        entry = self._cache.get(user_id)
+        metrics.inventory_cache_lookups.inc("miss" if entry is None else "hit")
+        return None if entry is None else entry[0]
+
+    def fill(self, user_id: str, pantry: Pantry, version: int):
+        with self._lock:
+            if version == self._version:
+                self._cache.set(user_id, (pantry, _pantry_size(pantry)))
+
+    def _write(self, user_id: str, change: Callable[[Pantry], Pantry]):
+        with self._lock:
+            self._version += 1
+            if self._cache.update(user_id, lambda entry: self._entry(change(entry[0]))):
+                self.write_throughs += 1
+
+    @staticmethod
+    def _entry(pantry: Pantry) -> Tuple[Pantry, int]:
+        return pantry, _pantry_size(pantry)
+
+    def put(self, user_id: str, item: PantryItem):
+        """Insert or replace one ingredient in a cached pantry"""
+        # Sorting a nearly sorted tuple is a single linear pass
+        self._write(user_id, lambda pantry: make_pantry(
+            (*(existing for existing in pantry if existing.id != item.id), item)
+        ))
+
+    def remove(self, user_id: str, ingredient_id: int):
+        self._write(user_id, lambda pantry: tuple(i for i in pantry if i.id != ingredient_id))
+
+    def nbytes(self) -> int:
+        return sum(size for _, size in self._cache.values())
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def stats(self) -> Dict[str, Any]:
+        nbytes = self.nbytes()
+        users = len(self._cache)
+        return {
+            **self._cache.stats(),
+            "write_throughs": self.write_throughs,
+            "bytes": nbytes,
+            "bytes_per_user": nbytes / users if users else 0.0
+        }
+
+inventory_cache = InventoryCache(
+    maxsize=settings.inventory_cache_size,
+    ttl=settings.inventory_cache_ttl
+)
+metrics.inventory_cache_users.set_function(lambda: len(inventory_cache))
+metrics.inventory_cache_bytes.set_function(inventory_cache.nbytes)
@@ -0,0 +1,76 @@
+"""Expiry-aware views of a pantry snapshot.
+
+Snapshots from `make_pantry` are ordered by expiry date, so these walk a
+prefix and stop at the first item past the horizon: the cost grows with the
+number of items about to expire, not with the size of the pantry.
+"""
+from itertools import chain, takewhile
+from typing import Dict, List, Optional, Tuple
+import re
+import time
+from .cache import Pantry, PantryItem
+from .recipe_index import normalize_name, normalize_unit
+
+DAY = 24 * 60 * 60
+
+def expiring(pantry: Pantry, within_days: float, now: Optional[float] = None) -> List[PantryItem]:
+    """Items expiring within `within_days`, soonest first, expired ones included"""
+    cutoff = (time.time() if now is None else now) + within_days * DAY
+    return list(takewhile(
+        lambda item: item.expires_at is not None and item.expires_at <= cutoff,
+        pantry
+    ))
+
+def urgency(item: PantryItem, now: float) -> float:
+    """1 for stock expiring now, halving after one day, a third after two..."""
+    return 1.0 / (1.0 + max(item.expires_at - now, 0.0) / DAY)
+
+def expiring_stock(pantry: Pantry, within_days: float, now: float) -> Dict[str, Tuple[float, str, float]]:
+    """Normalized name -> (quantity, unit, urgency) of usable near-expiry stock.
+
+    Items past their expiry date are left out: they should be thrown away,
+    not planned into a meal.
+    """
+    stock: Dict[str, Tuple[float, str, float]] = {}
+    for item in expiring(pantry, within_days, now):
+        if item.expires_at < now:
+            continue
+        key = normalize_name(item.name)
+        unit = normalize_unit(item.unit)
+        previous = stock.get(key)
+        if previous is not None and previous[1] == unit:
+            # Items arrive soonest first, so the earlier urgency is the larger
+            stock[key] = (previous[0] + item.quantity, unit, previous[2])
+        elif previous is None:
+            stock[key] = (item.quantity, unit, urgency(item, now))
+    return stock
+
+def prompt_ingredients(pantry: Pantry, query: str, limit: int, now: Optional[float] = None) -> List[str]:
+    """Up to `limit` distinct ingredient names to put in a chat prompt.
+
+    Ingredients the request mentions come first, then the rest in pantry
+    order (soonest expiry first, undated after) and expired items last.
+    Beyond one regex search per item for mentions, only the items that end
+    up in the list are normalized.
+    """
+    now = time.time() if now is None else now
+    words = {normalize_name(word) for word in query.split()} - {""}
+    mentioned = []
+    if words:
+        candidate = re.compile("|".join(map(re.escape, words)), re.IGNORECASE).search
+        mentioned = [
+            item for item in pantry
+            if candidate(item.name) and words.intersection(normalize_name(item.name).split())
+        ]
+    # Expired items are a prefix of the snapshot
+    expired = sum(1 for _ in takewhile(
+        lambda item: item.expires_at is not None and item.expires_at < now,
+        pantry
+    ))
+
+    names: Dict[str, str] = {}
+    for item in chain(mentioned, pantry[expired:], pantry[:expired]):
+        if len(names) >= limit:
+            break
+        names.setdefault(normalize_name(item.name), item.name)
+    return list(names.values())
@@ -0,0 +1,131 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import List, Optional
+import asyncio
+import logging
+import multiprocessing
+import os
+import uuid
+from ..models.schemas import ImageJob
+from ..utils.config import get_settings
+from ..utils.image import extract_text
+from .cache import TTLCache
+from .recipe_service import get_recipe_service, load_langchain_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    pass
+
+def _discard(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+class ImageJobQueue:
+    """Bounded background queue turning recipe photos into saved recipes.
+
+    Submitting only enqueues the upload, spooled to disk; a fixed set of
+    worker tasks runs OCR in a process pool and the LLM parse off the request
+    path. When the queue is full, `submit` fails fast instead of letting work
+    pile up. A photo the user already submitted, while its job is still
+    around and has not failed, is answered with that job instead.
+    """
+
+    def __init__(self, workers: int, maxsize: int, ttl: float):
+        self.workers = workers
+        self.maxsize = maxsize
+        # Finished jobs stay pollable for `ttl` seconds
+        self._jobs = TTLCache(maxsize=10_000, ttl=ttl)
+        # (user id, SHA-256 of the upload) -> job id
+        self._by_digest = TTLCache(maxsize=10_000, ttl=ttl)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._ocr_executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._ocr_executor = self._new_ocr_executor()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _new_ocr_executor(self) -> ProcessPoolExecutor:
+        # Decoding holds the GIL, so keep it out of the server process.
+        # Spawned rather than forked: the server is already multithreaded
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def stop(self):
+        """Cancel the workers and drop queued uploads; safe to call before `start` or twice"""
+        if self._tasks:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+        while self._queue is not None and not self._queue.empty():
+            _, path, _ = self._queue.get_nowait()
+            _discard(path)
+        if self._ocr_executor is not None:
+            self._ocr_executor.shutdown(wait=False, cancel_futures=True)
+            self._ocr_executor = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def submit(self, path: str, digest: str, user_id: str) -> ImageJob:
+        """Queue the spooled upload at `path`, which the queue now owns"""
+        job_id = self._by_digest.get((user_id, digest))
+        existing = self._jobs.get(job_id) if job_id else None
+        if existing is not None and existing.status != "failed":
+            _discard(path)
+            return existing
+
+        job = ImageJob(id=str(uuid.uuid4()), status="queued", created_at=datetime.utcnow())
+        try:
+            self._queue.put_nowait((job.id, path, user_id))
+        except asyncio.QueueFull:
+            _discard(path)
+            raise QueueFullError("Image processing queue is full, retry later")
+        self._jobs.set(job.id, job)
+        self._by_digest.set((user_id, digest), job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[ImageJob]:
+        return self._jobs.get(job_id)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job_id, path, user_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            try:
+                if job is None:
+                    continue
+                job.status = "processing"
+                text = await loop.run_in_executor(
+                    self._ocr_executor, extract_text, path, settings.ocr_max_side
+                )
+                if not text.strip():
+                    raise ValueError("No text found in image")
+                recipe = await (await load_langchain_service()).aparse_recipe(text)
+                job.recipe = await get_recipe_service().create_recipe(recipe, user_id)
+                job.status = "completed"
+            except Exception as e:
+                logger.exception("Image job %s failed", job_id)
+                if isinstance(e, BrokenProcessPool):
+                    # An OCR process died (e.g. killed for memory) and took the pool with it
+                    self._ocr_executor = self._new_ocr_executor()
+                job.status = "failed"
+                job.error = getattr(e, "detail", None) or str(e)
+            finally:
+                _discard(path)
+                self._queue.task_done()
+
+# Create singleton instance
+image_jobs = ImageJobQueue(
+    workers=settings.image_job_workers,
+    maxsize=settings.image_job_queue_size,
+    ttl=settings.image_job_ttl
+)
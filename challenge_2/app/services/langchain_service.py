@@ -1,14 +1,22 @@
+from langchain.callbacks.base import BaseCallbackHandler
 from langchain.chat_models import ChatOpenAI
 from langchain.output_parsers import PydanticOutputParser
 from langchain.prompts import PromptTemplate
-from typing import List
-from ..models.schemas import RecipeCreate
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+from uuid import UUID
+import asyncio
+import logging
+import time
+from ..models.schemas import RecipeCreate, RecipeDetails
+from .llm_scheduler import LLMScheduler
 from ..utils.config import get_settings
-import os
+from ..utils.metrics import llm_tokens, record_span
+from ..utils.tokens import count_tokens, fit_to_tokens, truncate_to_tokens
 from fastapi import HTTPException
+from functools import lru_cache
 
 settings = get_settings()
-os.environ["OPENAI_API_KEY"] = settings.openai_api_key
+logger = logging.getLogger(__name__)
 
 RECIPE_PROMPT = """Extract structured recipe information from the following text.
 Pay special attention to quantities, units, and ingredient lists.
@@ -26,54 +34,234 @@ Requirements:
 
 {format_instructions}
 
-If any field is not explicitly mentioned in the text, use reasonable defaults based on the recipe context.
+If any field is not explicitly mentioned in the text, use reasonable defaults based on the recipe context:
+estimate times from the steps, difficulty from the number and complexity of steps, taste profile from
+the ingredients and cuisine type from the ingredients and style.
 Make sure all ingredients mentioned in instructions are included in the ingredients list.
 """
 
+ENRICHMENT_PROMPT = """Review this recipe and fill in the missing information: {missing}.
+
+Recipe: {recipe}
+
+Use reasonable estimates based on the ingredients, steps and style of the recipe.
+
+{format_instructions}
+"""
+
+# Fields the enrichment pass may fill in when extraction leaves them empty
+ENRICHABLE_FIELDS = list(RecipeDetails.__fields__)
+
+def _tokens(count: Optional[int]) -> str:
+    # Counts are None when the tiktoken encoding is unavailable
+    return "?" if count is None else str(count)
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Records and logs latency and prompt/completion tokens of every call to one LLM.
+
+    Covers direct calls, streams and chains alike. Runs inline rather than
+    on langchain's thread pool so spans land in the calling request's
+    Server-Timing.
+    """
+
+    run_inline = True
+
+    def __init__(self, name: str):
+        self.name = name
+        self.model_name = ""
+        # run id -> (start time, prompt tokens)
+        self._started: Dict[UUID, Tuple[float, Optional[int]]] = {}
+
+    def _count(self, kind: str, text: str) -> Optional[int]:
+        tokens = count_tokens(text, self.model_name)
+        if tokens is not None:
+            llm_tokens.inc(self.name, self.model_name, kind, amount=tokens)
+        return tokens
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        prompt_tokens = self._count("prompt", "\n".join(m.content for batch in messages for m in batch))
+        self._started[run_id] = (time.perf_counter(), prompt_tokens)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        completion_tokens = self._count(
+            "completion", "".join(g.text for batch in response.generations for g in batch)
+        )
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            elapsed = time.perf_counter() - started[0]
+            record_span("llm", self.name, elapsed)
+            logger.info(
+                "%s %s: %s prompt + %s completion tokens in %.2fs",
+                self.name, self.model_name, _tokens(started[1]), _tokens(completion_tokens), elapsed
+            )
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            elapsed = time.perf_counter() - started[0]
+            record_span("llm", self.name, elapsed)
+            logger.warning(
+                "%s %s failed after %.2fs (%s prompt tokens): %s",
+                self.name, self.model_name, elapsed, _tokens(started[1]), error
+            )
+
+def _instrumented(llm: ChatOpenAI, name: str) -> ChatOpenAI:
+    handler = LLMMetricsHandler(name)
+    handler.model_name = llm.model_name
+    llm.callbacks = [handler]
+    return llm
+
+def _scheduler(name: str, concurrency: int, rate: float) -> LLMScheduler:
+    return LLMScheduler(
+        name, concurrency, rate,
+        timeout=settings.llm_timeout, retries=settings.llm_retries, backoff=settings.llm_retry_backoff
+    )
+
 class LangChainService:
     def __init__(self):
+        # Timeouts and retries are left to the schedulers, which back off
+        # outside their concurrency slots instead of retrying inside them
+        client = dict(openai_api_key=settings.openai_api_key, request_timeout=settings.llm_timeout, max_retries=0)
         # For general recipe understanding - higher temperature for more creative interpretation
-        self.recipe_llm = ChatOpenAI(temperature=0.7, model_name="gpt-4")
+        self.recipe_llm = _instrumented(ChatOpenAI(temperature=0.7, model_name="gpt-4", **client), "recipe_llm")
         # For precise parsing - zero temperature for consistency
-        self.parser_llm = ChatOpenAI(temperature=0)
+        self.parser_llm = _instrumented(ChatOpenAI(temperature=0, **client), "parser_llm")
+        self.recipe_scheduler = _scheduler("recipe_llm", settings.llm_recipe_concurrency, settings.llm_recipe_rate)
+        self.parser_scheduler = _scheduler("parser_llm", settings.llm_parser_concurrency, settings.llm_parser_rate)
+
+        # Parsers and prompts are immutable, so build the chains once
+        recipe_parser = PydanticOutputParser(pydantic_object=RecipeCreate)
+        self.parse_chain = PromptTemplate(
+            template=RECIPE_PROMPT,
+            input_variables=["text"],
+            partial_variables={"format_instructions": recipe_parser.get_format_instructions()}
+        ) | self.parser_llm | recipe_parser
+        details_parser = PydanticOutputParser(pydantic_object=RecipeDetails)
+        self.enrichment_chain = PromptTemplate(
+            template=ENRICHMENT_PROMPT,
+            input_variables=["missing", "recipe"],
+            partial_variables={"format_instructions": details_parser.get_format_instructions()}
+        ) | self.recipe_llm | details_parser
+
+    @staticmethod
+    def _missing_fields(recipe: RecipeCreate) -> List[str]:
+        return [field for field in ENRICHABLE_FIELDS if getattr(recipe, field) is None]
+
+    @staticmethod
+    def _merge_details(recipe: RecipeCreate, details: RecipeDetails) -> RecipeCreate:
+        return recipe.copy(update={
+            field: value
+            for field, value in details.dict().items()
+            if value is not None and getattr(recipe, field) is None
+        })
+
+    def _recipe_text(self, text: str) -> str:
+        # Leaves room in the parser's context for the instructions and answer
+        return truncate_to_tokens(text, settings.prompt_text_tokens, self.parser_llm.model_name)
 
     def parse_recipe(self, text: str) -> RecipeCreate:
         """Parse unstructured recipe text into structured format"""
         try:
-            parser = PydanticOutputParser(pydantic_object=RecipeCreate)
-            prompt = PromptTemplate(
-                template=RECIPE_PROMPT,
-                input_variables=["text"],
-                partial_variables={"format_instructions": parser.get_format_instructions()}
-            )
+            recipe = self.parse_chain.invoke({"text": self._recipe_text(text)})
             
-            # First pass - extract structured data
-            chain = prompt | self.parser_llm | parser
-            recipe = chain.invoke({"text": text})
-            
-            # Second pass - enrich with additional context
-            enrichment_prompt = f"""Review this recipe and add any missing information:
-            {recipe.dict()}
-            
-            Add:
-            1. Reasonable time estimates if missing
-            2. Difficulty level based on steps
-            3. Taste profile based on ingredients
-            4. Cuisine type based on ingredients and style
-            """
-            
-            enrichment = self.recipe_llm.predict(enrichment_prompt)
+            # Second pass only when extraction could not infer everything
+            missing = self._missing_fields(recipe)
+            if missing:
+                details = self.enrichment_chain.invoke({
+                    "missing": ", ".join(missing),
+                    "recipe": recipe.json()
+                })
+                recipe = self._merge_details(recipe, details)
             return recipe
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Failed to parse recipe: {str(e)}")
 
-    def get_recipe_suggestions(self, query: str, available_ingredients: List[str]) -> str:
-        """Get recipe suggestions based on query and available ingredients"""
+    async def aparse_recipe(self, text: str) -> RecipeCreate:
+        """Async variant of `parse_recipe`.
+
+        Identical texts parsed at the same time share one set of LLM calls.
+        """
         try:
-            prompt = f"""
+            text = self._recipe_text(text)
+            recipe = await self.parser_scheduler.run(
+                lambda: self.parse_chain.ainvoke({"text": text}), key=text
+            )
+            
+            missing = self._missing_fields(recipe)
+            if missing:
+                inputs = {"missing": ", ".join(missing), "recipe": recipe.json()}
+                details = await self.recipe_scheduler.run(
+                    lambda: self.enrichment_chain.ainvoke(inputs), key=("enrich", inputs["missing"], inputs["recipe"])
+                )
+                recipe = self._merge_details(recipe, details)
+            return recipe
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to parse recipe: {str(e)}")
+
+    async def parse_recipes(
+        self,
+        texts: List[str],
+        concurrency: Optional[int] = None
+    ) -> List[Union[RecipeCreate, HTTPException]]:
+        """Parse many recipe texts concurrently, at most `concurrency` at a time.
+
+        Results keep the input order; a text that fails to parse yields the
+        HTTPException describing why instead of aborting the batch.
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.llm_parse_concurrency)
+
+        async def parse(text: str):
+            async with semaphore:
+                return await self.aparse_recipe(text)
+
+        return await asyncio.gather(*(parse(text) for text in texts), return_exceptions=True)
+
+    def _suggestion_prompt(
+        self,
+        query: str,
+        available_ingredients: List[str],
+        saved_recipes: Optional[List[str]] = None,
+        expiring_ingredients: Optional[List[str]] = None
+    ) -> str:
+        """The suggestion prompt, each part held to its token budget.
+
+        Ingredient lists arrive most important first and are cut from the
+        end; saved recipes share their budget equally.
+        """
+        model = self.recipe_llm.model_name
+        query = truncate_to_tokens(query, settings.prompt_query_tokens, model)
+        names = dict.fromkeys(" ".join(name.split()) for name in available_ingredients)
+        available_ingredients = fit_to_tokens(
+            (name for name in names if name), settings.prompt_ingredient_tokens, model
+        )
+        kept = set(available_ingredients)
+        expiring_ingredients = [
+            name for name in dict.fromkeys(" ".join(name.split()) for name in expiring_ingredients or [])
+            if name in kept
+        ]
+        if saved_recipes:
+            share = settings.prompt_recipe_tokens // len(saved_recipes)
+            saved_recipes = [truncate_to_tokens(recipe, share, model) for recipe in saved_recipes]
+
+        expiring = ""
+        if expiring_ingredients:
+            expiring = f"""
+            Use these soon, they are about to expire: {', '.join(expiring_ingredients)}
+            Prefer recipes that use them up.
+            """
+        saved = ""
+        if saved_recipes:
+            listing = "\n".join(f"            - {recipe}" for recipe in saved_recipes)
+            saved = f"""
+            The user's saved recipes most relevant to this request:
+{listing}
+            Prefer these saved recipes when they fit the request.
+            """
+        return f"""
             Based on these available ingredients: {', '.join(available_ingredients)}
             And the user's request: {query}
-            
+            {expiring}
+            {saved}
             Suggest suitable recipes following these rules:
             1. Prioritize recipes where most ingredients are available
             2. For each suggested recipe:
@@ -85,11 +273,39 @@ class LangChainService:
             
             Format suggestions clearly with bullet points and sections.
             """
-            
-            response = self.recipe_llm.predict(prompt)
+
+    async def get_recipe_suggestions(
+        self,
+        query: str,
+        available_ingredients: List[str],
+        saved_recipes: Optional[List[str]] = None,
+        expiring_ingredients: Optional[List[str]] = None
+    ) -> str:
+        """Get recipe suggestions based on query and available ingredients.
+
+        Identical prompts asked at the same time share one LLM call.
+        """
+        try:
+            prompt = self._suggestion_prompt(query, available_ingredients, saved_recipes, expiring_ingredients)
+            response = await self.recipe_scheduler.run(lambda: self.recipe_llm.apredict(prompt), key=prompt)
             return response
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Failed to get suggestions: {str(e)}")
 
-# Create a singleton instance
-langchain_service = LangChainService()
\ No newline at end of file
+    async def stream_recipe_suggestions(
+        self,
+        query: str,
+        available_ingredients: List[str],
+        saved_recipes: Optional[List[str]] = None,
+        expiring_ingredients: Optional[List[str]] = None
+    ) -> AsyncIterator[str]:
+        """Stream recipe suggestions token by token as the model generates them"""
+        prompt = self._suggestion_prompt(query, available_ingredients, saved_recipes, expiring_ingredients)
+        async for chunk in self.recipe_scheduler.stream(lambda: self.recipe_llm.astream(prompt)):
+            if chunk.content:
+                yield chunk.content
+
+@lru_cache
+def get_langchain_service() -> LangChainService:
+    """The process-wide LangChainService, created on first use"""
+    return LangChainService()
@@ -0,0 +1,213 @@
+"""Shared scheduling of outbound calls to one LLM.
+
+Every call made through a scheduler waits for a concurrency slot and, when a
+rate is configured, a token from a bucket refilled at that rate, so a burst
+of chat or parse requests queues in the worker instead of tripping the
+provider's rate limits. Identical calls already in flight are joined rather
+than repeated, and each attempt is bounded by a timeout, with transient
+failures retried after an exponential, jittered backoff.
+"""
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from ..utils import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Exception class names worth another attempt, matched by name so both the
+# openai 0.x and 1.x client hierarchies are covered. Not their common bases
+# (APIError, OpenAIError): those also cover bad requests and auth failures
+TRANSIENT_ERRORS = {
+    "Timeout", "APITimeoutError", "APIConnectionError", "RateLimitError",
+    "ServiceUnavailableError", "InternalServerError"
+}
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    # openai 1.x sets status_code on HTTP errors, 0.x http_status
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, bursts up to `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def acquire(self):
+        # Made in the loop that uses it; the bucket outlives test and reload loops
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock, self._loop = asyncio.Lock(), loop
+        # Callers queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class LLMScheduler:
+    def __init__(
+        self,
+        name: str,
+        concurrency: int,
+        rate: float = 0,
+        timeout: float = 60,
+        retries: int = 2,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.concurrency = concurrency
+        self._bucket = TokenBucket(rate, burst=max(1.0, rate)) if rate > 0 else None
+        # Bound to the event loop they were made in, see _bind
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def _bind(self):
+        """Create the asyncio primitives in the running loop.
+
+        The scheduler is built with the LLM service on the warmup thread and
+        lives for the process, which may run more than one loop (test
+        clients, reloads), so they are made again when the loop changes.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._inflight = {}
+
+    @asynccontextmanager
+    async def _slot(self):
+        self._bind()
+        semaphore = self._semaphore
+        metrics.llm_queue_depth.inc(self.name)
+        try:
+            await semaphore.acquire()
+        finally:
+            metrics.llm_queue_depth.dec(self.name)
+        try:
+            if self._bucket is not None:
+                metrics.llm_queue_depth.inc(self.name)
+                try:
+                    await self._bucket.acquire()
+                finally:
+                    metrics.llm_queue_depth.dec(self.name)
+            metrics.llm_in_flight.inc(self.name)
+            try:
+                yield
+            finally:
+                metrics.llm_in_flight.dec(self.name)
+        finally:
+            semaphore.release()
+
+    def _delay(self, attempt: int) -> float:
+        return min(self.backoff * 2 ** attempt, self.max_backoff) * random.uniform(0.5, 1.5)
+
+    async def _retry_after(self, attempt: int, error: BaseException) -> bool:
+        """Sleep before the next attempt, or return False if there is none"""
+        if attempt >= self.retries or not is_transient(error):
+            return False
+        delay = self._delay(attempt)
+        metrics.llm_retries.inc(self.name, type(error).__name__)
+        logger.warning(
+            "%s call failed (%s), retry %d/%d in %.1fs",
+            self.name, type(error).__name__, attempt + 1, self.retries, delay
+        )
+        await asyncio.sleep(delay)
+        return True
+
+    async def _attempts(self, call: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            try:
+                async with self._slot():
+                    return await asyncio.wait_for(call(), self.timeout)
+            except Exception as e:
+                if not await self._retry_after(attempt, e):
+                    raise
+            attempt += 1
+
+    async def run(self, call: Callable[[], Awaitable[T]], key: Optional[Hashable] = None) -> T:
+        """Await `call()` under this scheduler's limits.
+
+        Calls with the same `key` made while one is in flight share its
+        result. The shared call is not cancelled with the caller that
+        started it, so the others still get their answer.
+        """
+        if key is None:
+            return await self._attempts(call)
+
+        self._bind()
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._attempts(call))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            metrics.llm_coalesced.inc(self.name)
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the error as retrieved in case every waiter has gone
+            task.exception()
+
+    async def stream(self, start: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Iterate `start()` while holding a slot for the whole stream.
+
+        `timeout` bounds the wait for each chunk. Attempts are only retried
+        until the first chunk arrives; after that the caller has already
+        seen output and the error is raised.
+        """
+        attempt = 0
+        while True:
+            error = None
+            async with self._slot():
+                chunks = start().__aiter__()
+                try:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                    except StopAsyncIteration:
+                        return
+                    except Exception as e:
+                        error = e
+                    else:
+                        while True:
+                            yield chunk
+                            try:
+                                chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                            except StopAsyncIteration:
+                                return
+                finally:
+                    aclose = getattr(chunks, "aclose", None)
+                    if aclose is not None:
+                        await aclose()
+            # Back off outside the slot so waiting calls can use it
+            if not await self._retry_after(attempt, error):
+                raise error
+            attempt += 1
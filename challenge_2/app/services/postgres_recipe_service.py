@@ -0,0 +1,349 @@
+"""RecipeService over a direct Postgres connection instead of PostgREST.
+
+Selected with RECIPE_BACKEND=postgres. Statements are built with SQLAlchemy
+Core and run on the pooled asyncpg engine, which prepares each distinct
+statement once per connection and reuses it. A recipe loads together with
+its ingredients in one query, and writes spanning both tables run in one
+transaction, so a failed write leaves nothing behind to clean up.
+"""
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Union
+from fastapi import HTTPException
+from sqlalchemy import (
+    BigInteger, Boolean, Column, DateTime, Float, ForeignKey, Integer, MetaData, Table, Text,
+    delete, func, insert, literal_column, select, update
+)
+from sqlalchemy.dialects.postgresql import JSON, UUID, aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncConnection
+from ..database import dispose_async_engine, get_async_engine
+from ..models.schemas import (
+    Ingredient, IngredientCreate, Recipe, RecipeCreate, RecipeSummary
+)
+from ..utils.metrics import span
+from .cache import PANTRY_COLUMNS, Pantry, PantryItem, inventory_cache, make_pantry, suggestion_cache
+from .recipe_service import RecipeService, escape_like
+
+metadata = MetaData()
+
+recipes = Table(
+    "recipes", metadata,
+    Column("id", BigInteger, primary_key=True),
+    Column("user_id", UUID(as_uuid=False), nullable=False, index=True),
+    Column("name", Text, nullable=False),
+    Column("cuisine_type", Text),
+    Column("preparation_time", Integer),
+    Column("cooking_time", Integer),
+    Column("difficulty_level", Text),
+    Column("taste_profile", Text),
+    Column("instructions", Text, nullable=False),
+    Column("is_vegetarian", Boolean),
+    Column("vector_store_id", Text),
+    Column("average_rating", Float),
+    Column("number_of_reviews", Integer),
+    Column("created_at", DateTime(timezone=True))
+)
+
+recipe_ingredients = Table(
+    "recipe_ingredients", metadata,
+    Column("id", BigInteger, primary_key=True),
+    Column("recipe_id", BigInteger, ForeignKey("recipes.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("ingredient_name", Text, nullable=False),
+    Column("quantity", Float, nullable=False),
+    Column("unit", Text, nullable=False)
+)
+
+ingredients = Table(
+    "ingredients", metadata,
+    Column("id", BigInteger, primary_key=True),
+    Column("user_id", UUID(as_uuid=False), nullable=False, index=True),
+    Column("name", Text, nullable=False),
+    Column("quantity", Float, nullable=False),
+    Column("unit", Text, nullable=False),
+    Column("category", Text),
+    Column("expiry_date", DateTime(timezone=True)),
+    Column("last_updated", DateTime(timezone=True))
+)
+
+def _ingredients_json(with_ids: bool = False):
+    """A recipe's ingredients as a JSON array, aggregated inside the recipe query"""
+    columns = (recipe_ingredients.c.ingredient_name, recipe_ingredients.c.quantity, recipe_ingredients.c.unit)
+    if with_ids:
+        columns = (recipe_ingredients.c.id, *columns)
+    pairs = [part for column in columns for part in (literal_column(f"'{column.name}'"), column)]
+    rows = select(func.json_agg(aggregate_order_by(func.json_build_object(*pairs), recipe_ingredients.c.id)))\
+        .where(recipe_ingredients.c.recipe_id == recipes.c.id)\
+        .scalar_subquery()
+    return func.coalesce(rows, literal_column("'[]'::json"), type_=JSON).label("ingredients")
+
+async def _execute(operation: str, statement) -> List[dict]:
+    """Run one statement in autocommit mode, skipping BEGIN/COMMIT round-trips"""
+    with span("postgres", operation):
+        engine = get_async_engine().execution_options(isolation_level="AUTOCOMMIT")
+        async with engine.connect() as connection:
+            result = await connection.execute(statement)
+            return [dict(row) for row in result.mappings()] if result.returns_rows else []
+
+@asynccontextmanager
+async def _transaction(operation: str) -> AsyncIterator[AsyncConnection]:
+    with span("postgres", operation):
+        async with get_async_engine().begin() as connection:
+            yield connection
+
+def _error_detail(e: Exception) -> str:
+    # The driver's message, without SQLAlchemy's echo of the statement and parameters
+    return str(getattr(e, "orig", None) or e)
+
+class PostgresRecipeService(RecipeService):
+    @staticmethod
+    async def _insert_recipes(connection: AsyncConnection, items: List[RecipeCreate], user_id: str) -> List[Recipe]:
+        rows = [RecipeService._recipe_row(recipe, user_id) for recipe in items]
+        for row in rows:
+            row["created_at"] = datetime.fromisoformat(row["created_at"])
+        result = await connection.execute(
+            insert(recipes).returning(*recipes.c, sort_by_parameter_order=True),
+            rows
+        )
+        created = result.mappings().all()
+        ingredient_rows = [
+            ingredient_row
+            for row, recipe in zip(created, items)
+            for ingredient_row in RecipeService._ingredient_rows(row["id"], recipe.ingredients)
+        ]
+        if ingredient_rows:
+            await connection.execute(insert(recipe_ingredients), ingredient_rows)
+        return [Recipe(**row, ingredients=recipe.ingredients) for row, recipe in zip(created, items)]
+
+    @staticmethod
+    async def create_recipe(recipe: RecipeCreate, user_id: str) -> Recipe:
+        """Create a recipe and its ingredients in one transaction"""
+        try:
+            async with _transaction("create_recipe") as connection:
+                created = (await PostgresRecipeService._insert_recipes(connection, [recipe], user_id))[0]
+            RecipeService._index_recipes([created], user_id)
+            await RecipeService._embed_recipes([created], user_id)
+            return created
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=_error_detail(e))
+
+    @staticmethod
+    async def _create_recipe_chunk(items: List[RecipeCreate], user_id: str) -> List[Union[Recipe, str]]:
+        """Insert a chunk in one transaction, falling back to one transaction per recipe"""
+        try:
+            async with _transaction("create_recipes") as connection:
+                return await PostgresRecipeService._insert_recipes(connection, items, user_id)
+        except Exception:
+            if len(items) == 1:
+                raise
+
+        results: List[Union[Recipe, str]] = []
+        for recipe in items:
+            try:
+                results.extend(await PostgresRecipeService._create_recipe_chunk([recipe], user_id))
+            except Exception as e:
+                results.append(_error_detail(e))
+        return results
+
+    @staticmethod
+    def _recipe_query(fields: Optional[List[str]]):
+        if fields is None:
+            return select(*recipes.c, _ingredients_json())
+        columns = [recipes.c[name] for name in RecipeService._recipe_columns(fields)]
+        if "ingredients" in fields:
+            columns.append(_ingredients_json())
+        return select(*columns)
+
+    @staticmethod
+    async def get_recipes(
+        user_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[int] = None,
+        cuisine_type: Optional[str] = None,
+        difficulty_level: Optional[str] = None,
+        is_vegetarian: Optional[bool] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[Union[Recipe, RecipeSummary]]:
+        """Get a user's recipes with their ingredients in a single query"""
+        try:
+            query = PostgresRecipeService._recipe_query(fields).where(recipes.c.user_id == user_id)
+            if cuisine_type is not None:
+                query = query.where(recipes.c.cuisine_type.ilike(escape_like(cuisine_type)))
+            if difficulty_level is not None:
+                query = query.where(recipes.c.difficulty_level.ilike(escape_like(difficulty_level)))
+            if is_vegetarian is not None:
+                query = query.where(recipes.c.is_vegetarian == is_vegetarian)
+            if cursor is not None:
+                query = query.where(recipes.c.id > cursor)
+            if limit is not None:
+                query = query.order_by(recipes.c.id).limit(limit)
+
+            model = Recipe if fields is None else RecipeSummary
+            return [model(**row) for row in await _execute("get_recipes", query)]
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=_error_detail(e))
+
+    @staticmethod
+    async def get_recipe(recipe_id: int, user_id: str) -> Optional[Recipe]:
+        """Get a recipe with its ingredients in a single query"""
+        try:
+            rows = await _execute(
+                "get_recipe",
+                PostgresRecipeService._recipe_query(None)
+                .where(recipes.c.id == recipe_id, recipes.c.user_id == user_id)
+            )
+            return Recipe(**rows[0]) if rows else None
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=_error_detail(e))
+
+    @staticmethod
+    async def update_recipe(recipe_id: int, recipe: RecipeCreate, user_id: str) -> Recipe:
+        """Update a recipe and the ingredients that changed in one transaction"""
+        try:
+            async with _transaction("update_recipe") as connection:
+                # The current ingredient rows come back with the update, so
+                # they can be diffed without a separate read
+                result = await connection.execute(
+                    update(recipes)
+                    .where(recipes.c.id == recipe_id, recipes.c.user_id == user_id)
+                    .values(**recipe.dict(exclude={"ingredients"}))
+                    .returning(*recipes.c, _ingredients_json(with_ids=True))
+                )
+                row = result.mappings().first()
+                if row is None:
+                    raise HTTPException(status_code=404, detail="Recipe not found")
+
+                # Unchanged rows keep their ids and are not rewritten
+                to_delete, to_insert = RecipeService._diff_ingredients(row["ingredients"], recipe.ingredients)
+                if to_delete:
+                    await connection.execute(
+                        delete(recipe_ingredients)
+                        .where(recipe_ingredients.c.recipe_id == recipe_id, recipe_ingredients.c.id.in_(to_delete))
+                    )
+                if to_insert:
+                    await connection.execute(
+                        insert(recipe_ingredients),
+                        RecipeService._ingredient_rows(recipe_id, to_insert)
+                    )
+
+            updated = Recipe(**{**row, "ingredients": recipe.ingredients})
+            RecipeService._index_recipes([updated], user_id)
+            await RecipeService._embed_recipes([updated], user_id)
+            return updated
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=_error_detail(e))
+
+    @staticmethod
+    async def delete_recipe(recipe_id: int, user_id: str):
+        """Delete a recipe; its ingredients go with it through ON DELETE CASCADE"""
+        try:
+            rows = await _execute(
+                "delete_recipe",
+                delete(recipes)
+                .where(recipes.c.id == recipe_id, recipes.c.user_id == user_id)
+                .returning(recipes.c.vector_store_id)
+            )
+            if not rows:
+                raise HTTPException(status_code=404, detail="Recipe not found")
+
+            await RecipeService._forget_recipe(recipe_id, rows[0]["vector_store_id"], user_id)
+            return {"message": "Recipe deleted successfully"}
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=_error_detail(e))
+
+    @staticmethod
+    async def add_ingredient(ingredient: IngredientCreate, user_id: str) -> Ingredient:
+        """Add a new ingredient"""
+        try:
+            rows = await _execute(
+                "add_ingredient",
+                insert(ingredients)
+                .values(**ingredient.dict(), user_id=user_id, last_updated=datetime.utcnow())
+                .returning(*ingredients.c)
+            )
+            inventory_cache.put(user_id, PantryItem.from_row(rows[0]))
+            suggestion_cache.invalidate_user(user_id)
+            return Ingredient(**rows[0])
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=_error_detail(e))
+
+    @staticmethod
+    async def get_ingredients(
+        user_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[int] = None,
+        category: Optional[str] = None,
+        expiring_before: Optional[datetime] = None
+    ) -> List[Ingredient]:
+        """Get ingredients for a user, optionally one id-ordered page at a time"""
+        try:
+            query = select(ingredients).where(ingredients.c.user_id == user_id)
+            if category is not None:
+                query = query.where(ingredients.c.category.ilike(escape_like(category)))
+            if expiring_before is not None:
+                query = query.where(ingredients.c.expiry_date <= expiring_before)
+            if cursor is not None:
+                query = query.where(ingredients.c.id > cursor)
+            if limit is not None:
+                query = query.order_by(ingredients.c.id).limit(limit)
+
+            return [Ingredient(**row) for row in await _execute("get_ingredients", query)]
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=_error_detail(e))
+
+    @staticmethod
+    async def _load_pantry(user_id: str) -> Pantry:
+        query = select(*(ingredients.c[column] for column in PANTRY_COLUMNS))\
+            .where(ingredients.c.user_id == user_id)
+        return make_pantry(PantryItem.from_row(row) for row in await _execute("load_pantry", query))
+
+    @staticmethod
+    async def update_ingredient(ingredient_id: int, ingredient: IngredientCreate, user_id: str) -> Ingredient:
+        """Update an ingredient"""
+        try:
+            rows = await _execute(
+                "update_ingredient",
+                update(ingredients)
+                .where(ingredients.c.id == ingredient_id, ingredients.c.user_id == user_id)
+                .values(**ingredient.dict(), last_updated=datetime.utcnow())
+                .returning(*ingredients.c)
+            )
+            if not rows:
+                raise HTTPException(status_code=404, detail="Ingredient not found or access denied")
+
+            inventory_cache.put(user_id, PantryItem.from_row(rows[0]))
+            suggestion_cache.invalidate_user(user_id)
+            return Ingredient(**rows[0])
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=_error_detail(e))
+
+    @staticmethod
+    async def delete_ingredient(ingredient_id: int, user_id: str):
+        """Delete an ingredient"""
+        try:
+            rows = await _execute(
+                "delete_ingredient",
+                delete(ingredients)
+                .where(ingredients.c.id == ingredient_id, ingredients.c.user_id == user_id)
+                .returning(ingredients.c.id)
+            )
+            if not rows:
+                raise HTTPException(status_code=404, detail="Ingredient not found or access denied")
+
+            inventory_cache.remove(user_id, ingredient_id)
+            suggestion_cache.invalidate_user(user_id)
+            return {"message": "Ingredient deleted successfully"}
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=_error_detail(e))
+
+    async def close(self):
+        await dispose_async_engine()
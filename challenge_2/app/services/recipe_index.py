@@ -0,0 +1,297 @@
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+import heapq
+import re
+import threading
+import time
+from ..models.schemas import ExpiryMatch, RecipeMatch
+from ..utils.config import get_settings
+
+settings = get_settings()
+
+def normalize_name(name: str) -> str:
+    """Canonical form of an ingredient name ("Red  Onions" -> "red onion")"""
+    name = re.sub(r"[^\w\s]", " ", name.lower())
+    words = name.split()
+    if words:
+        last = words[-1]
+        if len(last) > 4 and last.endswith("ies"):
+            words[-1] = last[:-3] + "y"
+        elif len(last) > 4 and last.endswith(("oes", "ches", "shes", "xes", "sses")):
+            words[-1] = last[:-2]
+        elif len(last) > 3 and last.endswith("s") and not last.endswith(("ss", "us")):
+            words[-1] = last[:-1]
+    return " ".join(words)
+
+def normalize_unit(unit: Optional[str]) -> str:
+    return (unit or "").strip().lower().rstrip("s")
+
+class _Requirement(NamedTuple):
+    display_name: str
+    quantity: float
+    unit: str
+
+class _IndexedRecipe(NamedTuple):
+    user_id: str
+    name: str
+    requirements: Dict[str, _Requirement]
+
+class RecipeIndex:
+    """In-process inverted index from normalized ingredient name to recipe ids.
+
+    Postings are kept per user so a lookup only touches that user's recipes.
+    A user's recipes are loaded from the database (see `load_user`) and then
+    maintained incrementally as recipes are created, updated and deleted
+    through this process. Writes made by other worker processes are not
+    seen, so a load only counts for `ttl` seconds before the user is
+    reloaded. A load that raced a write is not kept, since its rows may
+    predate the write.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._postings: Dict[str, Dict[str, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self._recipes: Dict[int, _IndexedRecipe] = {}
+        self._sizes: Dict[int, int] = {}
+        self._user_recipes: Dict[str, Set[int]] = defaultdict(set)
+        # user id -> monotonic time of the load
+        self._loaded_at: Dict[str, float] = {}
+        self._version = 0
+        self._lock = threading.RLock()
+
+    @property
+    def version(self) -> int:
+        """Take before reading the database; pass to `load_user` afterwards"""
+        return self._version
+
+    def is_loaded(self, user_id: str) -> bool:
+        loaded_at = self._loaded_at.get(user_id)
+        return loaded_at is not None and time.monotonic() - loaded_at < self.ttl
+
+    def load_user(self, user_id: str, recipes: Iterable, version: int):
+        """Replace a user's indexed recipes with those fetched from the database.
+
+        The recipes are indexed either way, but the user only counts as
+        loaded if no write happened since `version` was taken.
+        """
+        recipes = [(recipe.id, recipe.name, self._requirements(recipe.ingredients)) for recipe in recipes]
+        with self._lock:
+            for recipe_id in list(self._user_recipes.get(user_id, ())):
+                self._remove(recipe_id)
+            for recipe_id, name, requirements in recipes:
+                self._store(recipe_id, user_id, name, requirements)
+            if version == self._version:
+                self._loaded_at[user_id] = time.monotonic()
+            else:
+                self._loaded_at.pop(user_id, None)
+
+    def invalidate(self):
+        """Record a write to a user that is not loaded, so racing loads are dropped"""
+        with self._lock:
+            self._version += 1
+
+    @staticmethod
+    def _requirements(ingredients: Iterable) -> Dict[str, _Requirement]:
+        requirements: Dict[str, _Requirement] = {}
+        for ingredient in ingredients:
+            key = normalize_name(ingredient.ingredient_name)
+            if not key:
+                continue
+            unit = normalize_unit(ingredient.unit)
+            previous = requirements.get(key)
+            quantity = ingredient.quantity or 0.0
+            if previous is not None and previous.unit == unit:
+                quantity += previous.quantity
+            requirements[key] = _Requirement(ingredient.ingredient_name, quantity, unit)
+        return requirements
+
+    def add(self, recipe_id: int, user_id: str, name: str, ingredients: Iterable):
+        """Insert or replace a recipe's postings"""
+        requirements = self._requirements(ingredients)
+        with self._lock:
+            self._version += 1
+            self._store(recipe_id, user_id, name, requirements)
+
+    def remove(self, recipe_id: int):
+        with self._lock:
+            self._version += 1
+            self._remove(recipe_id)
+
+    def _store(self, recipe_id: int, user_id: str, name: str, requirements: Dict[str, _Requirement]):
+        self._remove(recipe_id)
+        user_postings = self._postings[user_id]
+        for key in requirements:
+            user_postings[key].add(recipe_id)
+        self._recipes[recipe_id] = _IndexedRecipe(user_id, name, requirements)
+        self._sizes[recipe_id] = len(requirements)
+        self._user_recipes[user_id].add(recipe_id)
+
+    def _remove(self, recipe_id: int):
+        indexed = self._recipes.pop(recipe_id, None)
+        if indexed is None:
+            return
+        del self._sizes[recipe_id]
+        self._user_recipes[indexed.user_id].discard(recipe_id)
+        user_postings = self._postings[indexed.user_id]
+        for key in indexed.requirements:
+            postings = user_postings.get(key)
+            if postings is not None:
+                postings.discard(recipe_id)
+                if not postings:
+                    del user_postings[key]
+
+    def match(
+        self,
+        user_id: str,
+        pantry: Dict[str, Tuple[float, str]],
+        limit: int = 10,
+        min_coverage: float = 0.0
+    ) -> List[RecipeMatch]:
+        """Rank a user's recipes by how much of them the pantry covers.
+
+        `pantry` maps normalized ingredient names to (quantity, normalized
+        unit). An ingredient counts as insufficient only when the units agree
+        and the pantry holds less than the recipe needs; quantities in
+        different units cannot be compared and are treated as available.
+        """
+        with self._lock:
+            user_postings = self._postings.get(user_id, {})
+            counts: Counter = Counter()
+            for key in pantry:
+                counts.update(user_postings.get(key, ()))
+
+            sizes = self._sizes
+            coverage = {
+                recipe_id: count / sizes[recipe_id]
+                for recipe_id, count in counts.items()
+            }
+            if min_coverage > 0:
+                coverage = {rid: c for rid, c in coverage.items() if c >= min_coverage}
+
+            # Sufficient coverage can never exceed coverage, so only the best
+            # `limit` recipes by coverage are scored at first; the worst of
+            # their scores then bounds which other recipes could still win.
+            seed = heapq.nlargest(limit, coverage, key=coverage.__getitem__)
+            scored = {
+                recipe_id: self._score(recipe_id, counts[recipe_id], coverage[recipe_id], pantry)
+                for recipe_id in seed
+            }
+            if len(scored) >= limit:
+                threshold = min(score[0] for score in scored.values())
+                for recipe_id, value in coverage.items():
+                    if value >= threshold and recipe_id not in scored:
+                        scored[recipe_id] = self._score(recipe_id, counts[recipe_id], value, pantry)
+
+            return [
+                self._describe(-score[3], score[1], score[0], pantry)
+                for score in heapq.nlargest(limit, scored.values())
+            ]
+
+    def _score(
+        self,
+        recipe_id: int,
+        matched: int,
+        coverage: float,
+        pantry: Dict[str, Tuple[float, str]]
+    ) -> Tuple[float, float, int, int]:
+        """Sort key: sufficient coverage, coverage, fewest missing, lowest id"""
+        requirements = self._recipes[recipe_id].requirements
+        insufficient = 0
+        for key, required in requirements.items():
+            held = pantry.get(key)
+            if held is not None and held[1] == required.unit and held[0] < required.quantity:
+                insufficient += 1
+        sufficient = (matched - insufficient) / len(requirements)
+        return (sufficient, coverage, matched - len(requirements), -recipe_id)
+
+    def _describe(
+        self,
+        recipe_id: int,
+        coverage: float,
+        sufficient: float,
+        pantry: Dict[str, Tuple[float, str]]
+    ) -> RecipeMatch:
+        indexed = self._recipes[recipe_id]
+        matched, missing, insufficient = [], [], []
+        for key, required in indexed.requirements.items():
+            held = pantry.get(key)
+            if held is None:
+                missing.append(required.display_name)
+                continue
+            matched.append(required.display_name)
+            if held[1] == required.unit and held[0] < required.quantity:
+                insufficient.append(required.display_name)
+        return RecipeMatch(
+            recipe_id=recipe_id,
+            name=indexed.name,
+            coverage=coverage,
+            sufficient_coverage=sufficient,
+            matched_ingredients=matched,
+            missing_ingredients=missing,
+            insufficient_ingredients=insufficient
+        )
+
+    def rank_by_expiry(
+        self,
+        user_id: str,
+        stock: Dict[str, Tuple[float, str, float]],
+        pantry: Dict[str, Tuple[float, str]],
+        limit: int = 10
+    ) -> List[ExpiryMatch]:
+        """Rank a user's recipes by how much near-expiry stock they use up.
+
+        `stock` maps normalized names to (quantity, unit, urgency). A recipe
+        earns each item's urgency times the share of that stock it needs,
+        all of it when the units cannot be compared; scores are divided by
+        the total urgency, so 1.0 means the recipe uses up everything.
+        """
+        total = sum(weight for _, _, weight in stock.values())
+        if not total:
+            return []
+        with self._lock:
+            user_postings = self._postings.get(user_id, {})
+            scores: Dict[int, float] = defaultdict(float)
+            for key, (held, unit, weight) in stock.items():
+                for recipe_id in user_postings.get(key, ()):
+                    required = self._recipes[recipe_id].requirements[key]
+                    if required.unit == unit and held > 0:
+                        scores[recipe_id] += weight * min(required.quantity / held, 1.0)
+                    else:
+                        scores[recipe_id] += weight
+
+            best = heapq.nlargest(limit, scores.items(), key=lambda entry: (entry[1], -entry[0]))
+            matches = []
+            for recipe_id, score in best:
+                indexed = self._recipes[recipe_id]
+                used = sorted(
+                    (key for key in indexed.requirements if key in stock),
+                    key=lambda key: -stock[key][2]
+                )
+                matches.append(ExpiryMatch(
+                    recipe_id=recipe_id,
+                    name=indexed.name,
+                    score=score / total,
+                    expiring_ingredients=[indexed.requirements[key].display_name for key in used],
+                    missing_ingredients=[
+                        required.display_name
+                        for key, required in indexed.requirements.items()
+                        if key not in pantry
+                    ]
+                ))
+            return matches
+
+def build_pantry(ingredients: Iterable) -> Dict[str, Tuple[float, str]]:
+    """Collapse pantry rows into normalized name -> (quantity, unit)"""
+    pantry: Dict[str, Tuple[float, str]] = {}
+    for ingredient in ingredients:
+        key = normalize_name(ingredient.name)
+        unit = normalize_unit(ingredient.unit)
+        quantity = ingredient.quantity or 0.0
+        previous = pantry.get(key)
+        if previous is not None and previous[1] == unit:
+            quantity += previous[0]
+        pantry[key] = (quantity, unit)
+    return pantry
+
+# Create singleton instance
+recipe_index = RecipeIndex(ttl=settings.recipe_index_ttl)
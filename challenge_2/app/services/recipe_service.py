@@ -1,35 +1,125 @@
-from typing import List, Optional
+from collections import defaultdict
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Tuple, Union
+import asyncio
+import logging
+import re
+import threading
+import time
 import uuid
 from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
 from datetime import datetime
-from ..models.schemas import RecipeCreate, Recipe, IngredientCreate, Ingredient
-from .langchain_service import langchain_service
-from supabase import create_client
+from ..models.schemas import (
+    RecipeCreate, Recipe, IngredientCreate, Ingredient, RecipeMatch,
+    RecipeBatchError, RecipeBatchResult, RecipeIngredientBase, RecipeSummary,
+    ExpiringIngredient, ExpiryMatch
+)
+from .supabase_client import get_supabase, execute, returning
+from .cache import PANTRY_COLUMNS, Pantry, PantryItem, inventory_cache, make_pantry, suggestion_cache
+from .recipe_index import recipe_index, build_pantry
+from .expiry import DAY, expiring, expiring_stock, prompt_ingredients
+from .vector_store import vector_store
 from ..utils.config import get_settings
 
 settings = get_settings()
-supabase = create_client(settings.supabase_url, settings.supabase_key)
+logger = logging.getLogger(__name__)
+
+# Columns of the `recipes` table that can be requested through `fields`
+RECIPE_COLUMNS = set(Recipe.__fields__) - {"ingredients"}
+
+def escape_like(value: str) -> str:
+    """`value` as an ILIKE pattern that matches only itself, ignoring case"""
+    # PostgREST also reads `*` as `%`; escaped, it at least never widens the match
+    return re.sub(r"([\\%_*])", r"\\\1", value)
+
+class SuggestionContext(NamedTuple):
+    available_ingredients: List[str]
+    expiring_ingredients: List[str]
+    saved_recipes: List[str]
+    cache_key: Tuple[str, str, str]
+    cached: Optional[str]
+
+_langchain_warmup: Optional[Future] = None
+_langchain_warmup_lock = threading.Lock()
+
+def _build_langchain_service(future: Future):
+    try:
+        from .langchain_service import get_langchain_service
+        future.set_result(get_langchain_service())
+    except BaseException as e:
+        future.set_exception(e)
+
+def _start_langchain_warmup() -> Future:
+    global _langchain_warmup
+    _langchain_warmup = Future()
+    threading.Thread(
+        target=_build_langchain_service, args=(_langchain_warmup,), name="llm-warmup", daemon=True
+    ).start()
+    return _langchain_warmup
+
+def warm_up_langchain_service() -> Future:
+    """Start building the LangChainService on a background thread.
+
+    langchain takes seconds to import, so it is kept off the app's import
+    path and off the event loop; the lifespan in main.py calls this at
+    startup and requests wait for the same build.
+    """
+    with _langchain_warmup_lock:
+        return _start_langchain_warmup()
+
+async def load_langchain_service():
+    """The LangChainService, waiting for the warmup if it is still running"""
+    with _langchain_warmup_lock:
+        warmup = _langchain_warmup
+        # A failed build is retried by the next request rather than cached
+        if warmup is None or (warmup.done() and warmup.exception() is not None):
+            warmup = _start_langchain_warmup()
+    return await asyncio.wrap_future(warmup)
 
 class RecipeService:
+    @staticmethod
+    def _recipe_row(recipe: RecipeCreate, user_id: str) -> dict:
+        """Shape a recipe for the `recipes` table"""
+        return {
+            **recipe.dict(exclude={'ingredients'}),
+            "user_id": user_id,
+            # Generate vector store ID
+            "vector_store_id": str(uuid.uuid4()),
+            "average_rating": 0.0,
+            "number_of_reviews": 0,
+            "created_at": datetime.utcnow().isoformat()
+        }
+
+    @staticmethod
+    def _ingredient_rows(recipe_id: int, ingredients: List[RecipeIngredientBase]) -> List[dict]:
+        """Shape a recipe's ingredients for the `recipe_ingredients` table"""
+        return [
+            {
+                "recipe_id": recipe_id,
+                **ingredient.dict(),
+            }
+            for ingredient in ingredients
+        ]
+
+    @staticmethod
+    def _index_recipes(recipes: List[Recipe], user_id: str):
+        if recipe_index.is_loaded(user_id):
+            for recipe in recipes:
+                recipe_index.add(recipe.id, user_id, recipe.name, recipe.ingredients)
+        else:
+            recipe_index.invalidate()
+
     @staticmethod
     async def create_recipe(recipe: RecipeCreate, user_id: str) -> Recipe:
         """Create a new recipe"""
         try:
-            # Generate vector store ID
-            vector_store_id = str(uuid.uuid4())
-            
             # Prepare recipe data
-            recipe_data = {
-                **recipe.dict(exclude={'ingredients'}),
-                "user_id": user_id,
-                "vector_store_id": vector_store_id,
-                "average_rating": 0.0,
-                "number_of_reviews": 0,
-                "created_at": datetime.utcnow().isoformat()
-            }
+            recipe_data = RecipeService._recipe_row(recipe, user_id)
             
             # Add to Supabase
-            recipe_response = supabase.table("recipes").insert(recipe_data).execute()
+            recipe_response = await execute(get_supabase().table("recipes").insert(recipe_data))
             
             if not recipe_response.data:
                 raise HTTPException(status_code=400, detail="Failed to create recipe")
@@ -37,48 +127,204 @@ class RecipeService:
             recipe_id = recipe_response.data[0]["id"]
             
             # Add recipe ingredients
-            ingredient_data = [
-                {
-                    "recipe_id": recipe_id,
-                    **ingredient.dict(),
-                }
-                for ingredient in recipe.ingredients
-            ]
+            ingredient_data = RecipeService._ingredient_rows(recipe_id, recipe.ingredients)
             
-            ingredients_response = supabase.table("recipe_ingredients").insert(ingredient_data).execute()
+            ingredients_response = await execute(get_supabase().table("recipe_ingredients").insert(ingredient_data))
             
             if not ingredients_response.data:
                 # Cleanup if ingredients insertion fails
-                supabase.table("recipes").delete().eq("id", recipe_id).execute()
+                await execute(get_supabase().table("recipes").delete().eq("id", recipe_id))
                 raise HTTPException(status_code=400, detail="Failed to add recipe ingredients")
             
-            return Recipe(**recipe_response.data[0])
+            created = Recipe(**recipe_response.data[0], ingredients=recipe.ingredients)
+            RecipeService._index_recipes([created], user_id)
+            await RecipeService._embed_recipes([created], user_id)
+            return created
             
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
 
     @staticmethod
-    async def get_recipes(user_id: str) -> List[Recipe]:
-        """Get all recipes with their ingredients for a user"""
+    async def _create_recipe_chunk(
+        recipes: List[RecipeCreate],
+        user_id: str
+    ) -> List[Union[Recipe, str]]:
+        """Insert a chunk with one bulk statement per table.
+
+        Returns a created Recipe or an error message per input. If a bulk
+        statement fails, the chunk is rolled back and retried item by item
+        so one bad recipe does not fail its neighbours.
+        """
+        recipe_ids: List[int] = []
+        try:
+            recipe_response = await execute(
+                get_supabase().table("recipes")
+                .insert([RecipeService._recipe_row(recipe, user_id) for recipe in recipes])
+            )
+            rows = recipe_response.data or []
+            recipe_ids = [row["id"] for row in rows]
+            if len(rows) != len(recipes):
+                raise HTTPException(status_code=400, detail="Failed to create recipes")
+            
+            # PostgREST returns bulk-inserted rows in input order
+            ingredient_data = [
+                ingredient_row
+                for row, recipe in zip(rows, recipes)
+                for ingredient_row in RecipeService._ingredient_rows(row["id"], recipe.ingredients)
+            ]
+            if ingredient_data:
+                ingredients_response = await execute(
+                    get_supabase().table("recipe_ingredients").insert(ingredient_data)
+                )
+                if len(ingredients_response.data or []) != len(ingredient_data):
+                    raise HTTPException(status_code=400, detail="Failed to add recipe ingredients")
+            
+            return [
+                Recipe(**row, ingredients=recipe.ingredients)
+                for row, recipe in zip(rows, recipes)
+            ]
+            
+        except Exception:
+            if recipe_ids:
+                try:
+                    await execute(get_supabase().table("recipes").delete().in_("id", recipe_ids))
+                except Exception:
+                    # Still retry item by item; the orphans are logged for cleanup
+                    logger.exception("Failed to remove recipes %s of a failed chunk", recipe_ids)
+            if len(recipes) == 1:
+                raise
+        
+        results: List[Union[Recipe, str]] = []
+        for recipe in recipes:
+            try:
+                results.extend(await RecipeService._create_recipe_chunk([recipe], user_id))
+            except HTTPException as e:
+                results.append(str(e.detail))
+            except Exception as e:
+                results.append(str(e))
+        return results
+
+    async def create_recipes(
+        self,
+        items: AsyncIterator[Tuple[int, Union[RecipeCreate, str]]],
+        user_id: str
+    ) -> RecipeBatchResult:
+        """Bulk-create recipes as they arrive, in chunks of `recipe_batch_chunk_size`.
+
+        `items` yields (position, recipe) pairs, or (position, error message)
+        for entries that could not be parsed, so failures are reported
+        against the caller's numbering.
+        """
+        start = time.perf_counter()
+        created: List[Recipe] = []
+        errors: List[RecipeBatchError] = []
+        pending: List[Tuple[int, RecipeCreate]] = []
+
+        async def flush():
+            if not pending:
+                return
+            results = await self._create_recipe_chunk([r for _, r in pending], user_id)
+            chunk_created = []
+            for (index, _), result in zip(pending, results):
+                if isinstance(result, Recipe):
+                    chunk_created.append(result)
+                else:
+                    errors.append(RecipeBatchError(index=index, detail=result))
+            pending.clear()
+            if chunk_created:
+                RecipeService._index_recipes(chunk_created, user_id)
+                await RecipeService._embed_recipes(chunk_created, user_id)
+                created.extend(chunk_created)
+
+        total = 0
+        async for index, item in items:
+            total += 1
+            if total > settings.recipe_batch_max_items:
+                errors.append(RecipeBatchError(
+                    index=index,
+                    detail=f"Batch limit of {settings.recipe_batch_max_items} recipes exceeded"
+                ))
+            elif isinstance(item, str):
+                errors.append(RecipeBatchError(index=index, detail=item))
+            else:
+                pending.append((index, item))
+                if len(pending) >= settings.recipe_batch_chunk_size:
+                    await flush()
+        await flush()
+
+        elapsed = time.perf_counter() - start
+        errors.sort(key=lambda error: error.index)
+        return RecipeBatchResult(
+            created=len(created),
+            failed=len(errors),
+            recipe_ids=[recipe.id for recipe in created],
+            errors=errors,
+            elapsed_seconds=elapsed,
+            recipes_per_second=len(created) / elapsed if elapsed else 0.0
+        )
+
+    @staticmethod
+    def _recipe_columns(fields: List[str]) -> List[str]:
+        """`recipes` columns for the requested Recipe fields, id first"""
+        unknown = set(fields) - RECIPE_COLUMNS - {"ingredients"}
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        return list(dict.fromkeys(["id"] + [f for f in fields if f in RECIPE_COLUMNS]))
+
+    @staticmethod
+    def _recipe_select(fields: Optional[List[str]]) -> str:
+        """PostgREST select clause for the requested Recipe fields"""
+        if fields is None:
+            return "*, recipe_ingredients(*)"
+        columns = RecipeService._recipe_columns(fields)
+        if "ingredients" in fields:
+            columns.append("recipe_ingredients(ingredient_name, quantity, unit)")
+        return ", ".join(columns)
+
+    @staticmethod
+    async def get_recipes(
+        user_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[int] = None,
+        cuisine_type: Optional[str] = None,
+        difficulty_level: Optional[str] = None,
+        is_vegetarian: Optional[bool] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[Union[Recipe, RecipeSummary]]:
+        """Get recipes with their ingredients for a user.
+
+        Results are ordered by id; pass the last id seen as `cursor` to get
+        the next page. With `fields`, only those columns are fetched and
+        RecipeSummary objects are returned.
+        """
         try:
             # Get recipes
-            recipe_response = supabase.table("recipes")\
-                .select("*, recipe_ingredients(*)")\
-                .eq("user_id", user_id)\
-                .execute()
+            query = get_supabase().table("recipes")\
+                .select(RecipeService._recipe_select(fields))\
+                .eq("user_id", user_id)
+            if cuisine_type is not None:
+                query = query.ilike("cuisine_type", escape_like(cuisine_type))
+            if difficulty_level is not None:
+                query = query.ilike("difficulty_level", escape_like(difficulty_level))
+            if is_vegetarian is not None:
+                query = query.eq("is_vegetarian", str(is_vegetarian).lower())
+            if cursor is not None:
+                query = query.gt("id", cursor)
+            if limit is not None:
+                query = query.order("id").limit(limit)
+            
+            recipe_response = await execute(query)
             
             if not recipe_response.data:
                 return []
                 
             # Convert to Recipe objects
+            model = Recipe if fields is None else RecipeSummary
             recipes = []
             for recipe_data in recipe_response.data:
-                ingredients = recipe_data.pop("recipe_ingredients", [])
-                recipe = Recipe(
-                    **recipe_data,
-                    ingredients=ingredients
-                )
-                recipes.append(recipe)
+                if "recipe_ingredients" in recipe_data:
+                    recipe_data["ingredients"] = recipe_data.pop("recipe_ingredients") or []
+                recipes.append(model(**recipe_data))
                 
             return recipes
             
@@ -89,12 +335,13 @@ class RecipeService:
     async def get_recipe(recipe_id: int, user_id: str) -> Optional[Recipe]:
         """Get a specific recipe with ingredients"""
         try:
-            response = supabase.table("recipes")\
-                .select("*, recipe_ingredients(*)")\
-                .eq("id", recipe_id)\
-                .eq("user_id", user_id)\
-                .single()\
-                .execute()
+            response = await execute(
+                get_supabase().table("recipes")
+                .select("*, recipe_ingredients(*)")
+                .eq("id", recipe_id)
+                .eq("user_id", user_id)
+                .single()
+            )
                 
             if not response.data:
                 return None
@@ -109,44 +356,73 @@ class RecipeService:
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
 
+    @staticmethod
+    def _diff_ingredients(
+        existing: List[dict],
+        ingredients: List[RecipeIngredientBase]
+    ) -> Tuple[List[int], List[RecipeIngredientBase]]:
+        """Rows to delete (by id) and ingredients to insert to reach `ingredients`"""
+        def key(name, quantity, unit):
+            return (name, float(quantity), unit)
+        
+        unmatched: Dict[tuple, List[int]] = defaultdict(list)
+        for row in existing:
+            unmatched[key(row["ingredient_name"], row["quantity"], row["unit"])].append(row["id"])
+        
+        to_insert = []
+        for ingredient in ingredients:
+            ids = unmatched.get(key(ingredient.ingredient_name, ingredient.quantity, ingredient.unit))
+            if ids:
+                ids.pop()
+            else:
+                to_insert.append(ingredient)
+        
+        to_delete = [row_id for ids in unmatched.values() for row_id in ids]
+        return to_delete, to_insert
+
     @staticmethod
     async def update_recipe(recipe_id: int, recipe: RecipeCreate, user_id: str) -> Recipe:
         """Update a recipe and its ingredients"""
         try:
-            # Verify ownership
-            existing_recipe = await RecipeService.get_recipe(recipe_id, user_id)
-            if not existing_recipe:
+            # Update recipe, filtered on ownership; the representation carries
+            # the current ingredient rows so they can be diffed without a read
+            recipe_data = recipe.dict(exclude={'ingredients'})
+            recipe_response = await execute(returning(
+                get_supabase().table("recipes")
+                .update(recipe_data)
+                .eq("id", recipe_id)
+                .eq("user_id", user_id),
+                "*, recipe_ingredients(*)"
+            ))
+            
+            if not recipe_response.data:
                 raise HTTPException(status_code=404, detail="Recipe not found")
             
-            # Update recipe
-            recipe_data = recipe.dict(exclude={'ingredients'})
-            recipe_response = supabase.table("recipes")\
-                .update(recipe_data)\
-                .eq("id", recipe_id)\
-                .execute()
-                
-            # Update ingredients
-            # First delete existing
-            supabase.table("recipe_ingredients")\
-                .delete()\
-                .eq("recipe_id", recipe_id)\
-                .execute()
-                
-            # Then add new
-            ingredient_data = [
-                {
-                    "recipe_id": recipe_id,
-                    **ingredient.dict(),
-                }
-                for ingredient in recipe.ingredients
-            ]
+            recipe_row = recipe_response.data[0]
+            existing = recipe_row.pop("recipe_ingredients", None) or []
             
-            supabase.table("recipe_ingredients")\
-                .insert(ingredient_data)\
-                .execute()
+            # Update ingredients: only touch rows that actually changed
+            to_delete, to_insert = RecipeService._diff_ingredients(existing, recipe.ingredients)
+            if to_delete:
+                await execute(
+                    get_supabase().table("recipe_ingredients")
+                    .delete()
+                    .eq("recipe_id", recipe_id)
+                    .in_("id", to_delete)
+                )
+            if to_insert:
+                await execute(
+                    get_supabase().table("recipe_ingredients")
+                    .insert(RecipeService._ingredient_rows(recipe_id, to_insert))
+                )
                 
-            return Recipe(**recipe_response.data[0])
+            updated = Recipe(**recipe_row, ingredients=recipe.ingredients)
+            RecipeService._index_recipes([updated], user_id)
+            await RecipeService._embed_recipes([updated], user_id)
+            return updated
             
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
 
@@ -154,20 +430,61 @@ class RecipeService:
     async def delete_recipe(recipe_id: int, user_id: str):
         """Delete a recipe"""
         try:
-            # Verify ownership
-            recipe = await RecipeService.get_recipe(recipe_id, user_id)
-            if not recipe:
-                raise HTTPException(status_code=404, detail="Recipe not found")
-            
-            # Delete from Supabase
+            # Delete from Supabase, filtered on ownership
             # (recipe_ingredients will be deleted automatically due to CASCADE)
-            response = supabase.table("recipes")\
-                .delete()\
-                .eq("id", recipe_id)\
-                .execute()
+            response = await execute(
+                get_supabase().table("recipes")
+                .delete()
+                .eq("id", recipe_id)
+                .eq("user_id", user_id)
+            )
+            
+            if not response.data:
+                raise HTTPException(status_code=404, detail="Recipe not found")
                 
+            await RecipeService._forget_recipe(recipe_id, response.data[0]["vector_store_id"], user_id)
             return {"message": "Recipe deleted successfully"}
             
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @staticmethod
+    async def _forget_recipe(recipe_id: int, vector_store_id: str, user_id: str):
+        """Drop a deleted recipe from the in-process indexes and the vector store"""
+        recipe_index.remove(recipe_id)
+        suggestion_cache.invalidate_user(user_id)
+        try:
+            await vector_store.remove_recipes([vector_store_id])
+        except Exception:
+            logger.exception("Failed to remove recipe %s from the vector store", recipe_id)
+
+    async def _load_recipe_index(self, user_id: str):
+        if not recipe_index.is_loaded(user_id):
+            version = recipe_index.version
+            recipe_index.load_user(user_id, await self.get_recipes(user_id), version)
+
+    async def match_recipes(self, user_id: str, limit: int = 10, min_coverage: float = 0.0) -> List[RecipeMatch]:
+        """Rank the user's stored recipes by how well the pantry covers them"""
+        try:
+            await self._load_recipe_index(user_id)
+            
+            pantry = build_pantry(await self.get_pantry(user_id))
+            return recipe_index.match(user_id, pantry, limit=limit, min_coverage=min_coverage)
+            
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def rank_by_expiry(self, user_id: str, within_days: float, limit: int = 10) -> List[ExpiryMatch]:
+        """Rank the user's stored recipes by how much near-expiry stock they use up"""
+        try:
+            await self._load_recipe_index(user_id)
+            
+            pantry = await self.get_pantry(user_id)
+            stock = expiring_stock(pantry, within_days, time.time())
+            return recipe_index.rank_by_expiry(user_id, stock, build_pantry(pantry), limit)
+            
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
 
@@ -176,35 +493,87 @@ class RecipeService:
         """Add a new ingredient"""
         try:
             ingredient_data = {
-                **ingredient.dict(),
+                # expiry_date is a datetime, which the PostgREST client cannot encode
+                **jsonable_encoder(ingredient),
                 "user_id": user_id,
                 "last_updated": datetime.utcnow().isoformat()
             }
             
-            response = supabase.table("ingredients").insert(ingredient_data).execute()
+            response = await execute(get_supabase().table("ingredients").insert(ingredient_data))
             
             if not response.data:
                 raise HTTPException(status_code=400, detail="Failed to add ingredient")
                 
+            inventory_cache.put(user_id, PantryItem.from_row(response.data[0]))
+            suggestion_cache.invalidate_user(user_id)
             return Ingredient(**response.data[0])
             
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
 
     @staticmethod
-    async def get_ingredients(user_id: str) -> List[Ingredient]:
-        """Get all ingredients for a user"""
+    async def get_ingredients(
+        user_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[int] = None,
+        category: Optional[str] = None,
+        expiring_before: Optional[datetime] = None
+    ) -> List[Ingredient]:
+        """Get ingredients for a user, optionally one id-ordered page at a time"""
         try:
-            response = supabase.table("ingredients")\
+            query = get_supabase().table("ingredients")\
                 .select("*")\
-                .eq("user_id", user_id)\
-                .execute()
+                .eq("user_id", user_id)
+            if category is not None:
+                query = query.ilike("category", escape_like(category))
+            if expiring_before is not None:
+                query = query.lte("expiry_date", expiring_before.isoformat())
+            if cursor is not None:
+                query = query.gt("id", cursor)
+            if limit is not None:
+                query = query.order("id").limit(limit)
+            
+            response = await execute(query)
                 
             return [Ingredient(**ing) for ing in response.data] if response.data else []
             
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
 
+    @staticmethod
+    async def _load_pantry(user_id: str) -> Pantry:
+        response = await execute(
+            get_supabase().table("ingredients")
+            .select(",".join(PANTRY_COLUMNS))
+            .eq("user_id", user_id)
+        )
+        return make_pantry(PantryItem.from_row(row) for row in response.data)
+
+    async def get_expiring_ingredients(self, user_id: str, within_days: float) -> List[ExpiringIngredient]:
+        """Ingredients expiring within `within_days`, soonest first"""
+        now = time.time()
+        return [
+            ExpiringIngredient(
+                id=item.id,
+                name=item.name,
+                quantity=item.quantity,
+                unit=item.unit,
+                category=item.category,
+                expiry_date=item.expiry_date,
+                days_left=(item.expires_at - now) / DAY
+            )
+            for item in expiring(await self.get_pantry(user_id), within_days, now)
+        ]
+
+    async def get_pantry(self, user_id: str) -> Pantry:
+        """The user's ingredients in compact form, from memory when cached"""
+        pantry = inventory_cache.get(user_id)
+        if pantry is None:
+            version = inventory_cache.version
+            pantry = await self._load_pantry(user_id)
+            inventory_cache.fill(user_id, pantry, version)
+        return pantry
+
     @staticmethod
     async def update_ingredient(
         ingredient_id: int,
@@ -213,32 +582,31 @@ class RecipeService:
     ) -> Ingredient:
         """Update an ingredient"""
         try:
-            # Verify ownership
-            existing = supabase.table("ingredients")\
-                .select("*")\
-                .eq("id", ingredient_id)\
-                .eq("user_id", user_id)\
-                .single()\
-                .execute()
+            update_data = {
+                **jsonable_encoder(ingredient),
+                "last_updated": datetime.utcnow().isoformat()
+            }
+            
+            # Filtering on user_id makes the write its own ownership check
+            response = await execute(
+                get_supabase().table("ingredients")
+                .update(update_data)
+                .eq("id", ingredient_id)
+                .eq("user_id", user_id)
+            )
                 
-            if not existing.data:
+            if not response.data:
                 raise HTTPException(
                     status_code=404,
                     detail="Ingredient not found or access denied"
                 )
                 
-            update_data = {
-                **ingredient.dict(),
-                "last_updated": datetime.utcnow().isoformat()
-            }
-            
-            response = supabase.table("ingredients")\
-                .update(update_data)\
-                .eq("id", ingredient_id)\
-                .execute()
-                
+            inventory_cache.put(user_id, PantryItem.from_row(response.data[0]))
+            suggestion_cache.invalidate_user(user_id)
             return Ingredient(**response.data[0])
             
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
 
@@ -246,43 +614,126 @@ class RecipeService:
     async def delete_ingredient(ingredient_id: int, user_id: str):
         """Delete an ingredient"""
         try:
-            # Verify ownership
-            existing = supabase.table("ingredients")\
-                .select("*")\
-                .eq("id", ingredient_id)\
-                .eq("user_id", user_id)\
-                .single()\
-                .execute()
+            # Filtering on user_id makes the write its own ownership check
+            response = await execute(
+                get_supabase().table("ingredients")
+                .delete()
+                .eq("id", ingredient_id)
+                .eq("user_id", user_id)
+            )
                 
-            if not existing.data:
+            if not response.data:
                 raise HTTPException(
                     status_code=404,
                     detail="Ingredient not found or access denied"
                 )
                 
-            supabase.table("ingredients")\
-                .delete()\
-                .eq("id", ingredient_id)\
-                .execute()
-                
+            inventory_cache.remove(user_id, ingredient_id)
+            suggestion_cache.invalidate_user(user_id)
             return {"message": "Ingredient deleted successfully"}
             
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
 
     @staticmethod
-    async def get_recipe_suggestions(query: str, user_id: str) -> str:
+    async def _embed_recipes(recipes: List[Recipe], user_id: str):
+        """Index recipes for retrieval; the database stays the source of truth"""
+        suggestion_cache.invalidate_user(user_id)
+        try:
+            await vector_store.add_recipes(recipes, user_id)
+        except Exception:
+            logger.exception("Failed to embed %d recipe(s) for retrieval", len(recipes))
+
+    async def _relevant_recipes(self, query: str, user_id: str) -> List[str]:
+        """Top-k saved recipes for the query, to ground the chat prompt"""
+        try:
+            if not vector_store.is_backfilled(user_id):
+                # Recipes stored before retrieval existed are embedded on first use
+                recipes = await self.get_recipes(user_id)
+                await vector_store.backfill(recipes, user_id)
+                if not recipes:
+                    return []
+            
+            matches = await vector_store.find_similar(user_id, query, settings.vector_store_top_k)
+            return [
+                match["document"] for match in matches
+                if match["distance"] <= settings.vector_store_max_distance
+            ]
+        except Exception:
+            logger.exception("Recipe retrieval failed, continuing without saved recipes")
+            return []
+
+    async def _suggestion_context(self, query: str, user_id: str) -> SuggestionContext:
+        """Prompt inputs for a suggestion, or the cached answer if there is one"""
+        pantry = await self.get_pantry(user_id)
+        now = time.time()
+        # Large pantries are cut down to what the request is most likely to use
+        available_ingredients = prompt_ingredients(pantry, query, settings.prompt_max_ingredients, now)
+        expiring_ingredients = list(dict.fromkeys(
+            item.name for item in expiring(pantry, settings.expiry_horizon_days, now)
+            if item.expires_at >= now
+        ))
+        # The expiring set changes as time passes, not only when the pantry does
+        cache_key = suggestion_cache.key(
+            user_id, query, available_ingredients + [f"expiring:{name}" for name in expiring_ingredients]
+        )
+        cached = suggestion_cache.get(cache_key)
+        if cached is not None:
+            return SuggestionContext(available_ingredients, expiring_ingredients, [], cache_key, cached)
+        
+        saved_recipes = await self._relevant_recipes(query, user_id)
+        return SuggestionContext(available_ingredients, expiring_ingredients, saved_recipes, cache_key, None)
+
+    async def get_recipe_suggestions(self, query: str, user_id: str) -> str:
         """Get recipe suggestions based on available ingredients"""
         try:
-            # Get available ingredients
-            ingredients = await RecipeService.get_ingredients(user_id)
-            available_ingredients = [ing.name for ing in ingredients]
+            context = await self._suggestion_context(query, user_id)
+            if context.cached is not None:
+                return context.cached
             
             # Get suggestions from LangChain
-            return langchain_service.get_recipe_suggestions(query, available_ingredients)
+            response = await (await load_langchain_service()).get_recipe_suggestions(
+                query, context.available_ingredients, context.saved_recipes, context.expiring_ingredients
+            )
+            if response:
+                suggestion_cache.set(context.cache_key, response)
+            return response
             
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
 
+    async def stream_recipe_suggestions(self, query: str, user_id: str) -> AsyncIterator[str]:
+        """Stream recipe suggestions based on available ingredients"""
+        context = await self._suggestion_context(query, user_id)
+        if context.cached is not None:
+            yield context.cached
+            return
+        
+        tokens = []
+        langchain_service = await load_langchain_service()
+        async for token in langchain_service.stream_recipe_suggestions(
+            query, context.available_ingredients, context.saved_recipes, context.expiring_ingredients
+        ):
+            tokens.append(token)
+            yield token
+        
+        # Only cache answers that streamed to completion
+        if tokens:
+            suggestion_cache.set(context.cache_key, "".join(tokens))
+
+    async def close(self):
+        """Release connections held by this backend"""
+
 # Create singleton instance
-recipe_service = RecipeService()
\ No newline at end of file
+recipe_service = RecipeService()
+
+@lru_cache
+def get_recipe_service() -> RecipeService:
+    """The RecipeService for the configured `recipe_backend`"""
+    if settings.recipe_backend == "postgres":
+        # Keeps SQLAlchemy's asyncio stack out of PostgREST deployments
+        from .postgres_recipe_service import PostgresRecipeService
+        return PostgresRecipeService()
+    return recipe_service
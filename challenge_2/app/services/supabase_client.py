@@ -0,0 +1,49 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from supabase import Client, create_client
+from ..utils.config import get_settings
+from ..utils.metrics import span
+
+settings = get_settings()
+
+@lru_cache
+def get_supabase() -> Client:
+    """The process-wide Supabase client, created on first use.
+
+    The app's lifespan calls this at startup, so importing the app stays
+    cheap and every worker builds its own client.
+    """
+    client = create_client(settings.supabase_url, settings.supabase_key)
+    # Create the PostgREST client now so all worker threads share one httpx
+    # session and its keep-alive connection pool
+    client.postgrest
+    return client
+
+def close_supabase():
+    if get_supabase.cache_info().currsize:
+        get_supabase().postgrest.session.close()
+        get_supabase.cache_clear()
+
+# supabase-py 2.0 only ships a synchronous PostgREST client, so every query is
+# executed on a bounded thread pool instead of the event loop
+_executor = ThreadPoolExecutor(
+    max_workers=settings.supabase_max_workers,
+    thread_name_prefix="supabase"
+)
+
+async def execute(query):
+    """Execute a PostgREST query builder without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    # Timed from the event loop, so waiting for a free worker thread counts too
+    with span("supabase", f"{query.http_method} {query.path}"):
+        return await loop.run_in_executor(_executor, query.execute)
+
+def returning(query, columns: str):
+    """Choose the columns an insert/update/delete returns.
+
+    postgrest-py only exposes `select` on reads, but PostgREST accepts it on
+    mutations too, including embedded resources, which saves a follow-up read.
+    """
+    query.params = query.params.add("select", columns)
+    return query
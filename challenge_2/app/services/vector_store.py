@@ -0,0 +1,154 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Sequence, Set
+import asyncio
+import hashlib
+import math
+import re
+import threading
+from ..models.schemas import Recipe
+from ..utils.config import get_settings
+from ..utils.metrics import span
+
+settings = get_settings()
+
+class HashingEmbeddingFunction:
+    """Deterministic bag-of-words embedding using signed feature hashing.
+
+    Needs no model download or network access, so recipes can be indexed
+    offline and tests get stable vectors. Unigrams and bigrams are hashed
+    into `dimensions` buckets and the result is L2-normalised for cosine
+    search.
+    """
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        words = re.findall(r"\w+", text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def __call__(self, input: Sequence[str]) -> List[List[float]]:
+        return [self._embed(text) for text in input]
+
+def recipe_document(recipe: Recipe) -> str:
+    """Text that represents a recipe in the vector index"""
+    details = [
+        value for value in (recipe.cuisine_type, recipe.difficulty_level, recipe.taste_profile)
+        if value
+    ]
+    parts = [recipe.name]
+    if details:
+        parts.append(", ".join(details))
+    parts.append("Ingredients: " + ", ".join(i.ingredient_name for i in recipe.ingredients))
+    parts.append(recipe.instructions)
+    return ". ".join(parts)
+
+class RecipeVectorStore:
+    """Persistent Chroma index of recipes, one document per `vector_store_id`.
+
+    Chroma's client is synchronous, so all calls go through a single worker
+    thread; that also serialises writes to the on-disk store.
+    """
+
+    def __init__(self, path: str, batch_size: int):
+        self.path = path
+        self.batch_size = batch_size
+        self.embedding_function = HashingEmbeddingFunction()
+        self._collection = None
+        # Users whose stored recipes have been compared against the index
+        self._backfilled_users: Set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector-store")
+
+    @property
+    def collection(self):
+        with self._lock:
+            if self._collection is None:
+                import chromadb
+                from chromadb.config import Settings as ChromaSettings
+
+                client = chromadb.PersistentClient(
+                    path=self.path,
+                    settings=ChromaSettings(anonymized_telemetry=False)
+                )
+                self._collection = client.get_or_create_collection(
+                    name="recipes",
+                    metadata={"hnsw:space": "cosine"},
+                    embedding_function=self.embedding_function
+                )
+            return self._collection
+
+    def upsert(self, recipes: List[Recipe], user_id: str):
+        for start in range(0, len(recipes), self.batch_size):
+            batch = recipes[start:start + self.batch_size]
+            self.collection.upsert(
+                ids=[recipe.vector_store_id for recipe in batch],
+                documents=[recipe_document(recipe) for recipe in batch],
+                metadatas=[{"user_id": user_id, "recipe_id": recipe.id} for recipe in batch]
+            )
+
+    def delete(self, vector_store_ids: List[str]):
+        if vector_store_ids:
+            self.collection.delete(ids=vector_store_ids)
+
+    def search(self, user_id: str, query: str, k: int) -> List[Dict[str, Any]]:
+        result = self.collection.query(
+            query_texts=[query],
+            n_results=k,
+            where={"user_id": user_id}
+        )
+        return [
+            {**metadata, "document": document, "distance": distance}
+            for metadata, document, distance in zip(
+                result["metadatas"][0], result["documents"][0], result["distances"][0]
+            )
+        ]
+
+    def indexed_ids(self, user_id: str) -> Set[str]:
+        return set(self.collection.get(where={"user_id": user_id}, include=[])["ids"])
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        with span("vector_store", fn.__name__):
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def add_recipes(self, recipes: List[Recipe], user_id: str):
+        """Embed and store recipes in batches of `batch_size`"""
+        await self._run(self.upsert, recipes, user_id)
+
+    async def remove_recipes(self, vector_store_ids: List[str]):
+        await self._run(self.delete, vector_store_ids)
+
+    async def find_similar(self, user_id: str, query: str, k: int) -> List[Dict[str, Any]]:
+        """Top-k of the user's recipes closest to `query`"""
+        return await self._run(self.search, user_id, query, k)
+
+    def is_backfilled(self, user_id: str) -> bool:
+        return user_id in self._backfilled_users
+
+    async def backfill(self, recipes: List[Recipe], user_id: str) -> int:
+        """Embed those of the user's `recipes` missing from the index, return how many.
+
+        Runs once per user and process: recipes written afterwards are embedded
+        as they are saved. A user having some documents says nothing about the
+        rest, so the ids are compared rather than checking for any document.
+        """
+        indexed = await self._run(self.indexed_ids, user_id)
+        missing = [recipe for recipe in recipes if recipe.vector_store_id not in indexed]
+        if missing:
+            await self.add_recipes(missing, user_id)
+        self._backfilled_users.add(user_id)
+        return len(missing)
+
+# Create singleton instance
+vector_store = RecipeVectorStore(
+    path=settings.vector_store_path,
+    batch_size=settings.vector_store_batch_size
+)
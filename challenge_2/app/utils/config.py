@@ -1,3 +1,5 @@
+from functools import lru_cache
+from typing import Optional
 from pydantic import BaseSettings
 
 class Settings(BaseSettings):
@@ -5,10 +7,77 @@ class Settings(BaseSettings):
     supabase_url: str
     supabase_key: str
     database_url: str
+    # "require" for Supabase; "disable" for a local Postgres
+    database_sslmode: str = "require"
+    # Prepared statements cached per asyncpg connection; set 0 behind a
+    # transaction-mode pooler such as Supabase's on port 6543
+    database_statement_cache_size: int = 100
+    # "postgrest" goes through the Supabase HTTP API, "postgres" queries
+    # DATABASE_URL directly over pooled asyncpg connections
+    recipe_backend: str = "postgrest"
     vector_store_path: str = "./vector_db"
+    vector_store_batch_size: int = 64
+    # Saved recipes retrieved into each chat prompt
+    vector_store_top_k: int = 3
+    # Cosine distance above which a retrieved recipe is considered unrelated
+    vector_store_max_distance: float = 0.9
+    # Upper bound on concurrent PostgREST round-trips per worker process
+    supabase_max_workers: int = 16
+    # Bulk recipe import: rows per INSERT statement and items per request
+    recipe_batch_chunk_size: int = 500
+    recipe_batch_max_items: int = 10000
+    # Background recipe extraction from photos
+    image_job_workers: int = 2
+    image_job_queue_size: int = 32
+    image_job_ttl: int = 3600
+    # Larger photo uploads are refused with 413. Accepted ones wait for OCR
+    # as files in this directory (default: the system temp directory)
+    image_max_bytes: int = 20 * 1024 * 1024
+    image_spool_dir: Optional[str] = None
+    # Longest image side handed to Tesseract
+    ocr_max_side: int = 2000
+    # Concurrent LLM extractions in LangChainService.parse_recipes
+    llm_parse_concurrency: int = 4
+    # Outbound calls per model: concurrent requests and requests per second
+    # (0 = unlimited). Calls queue in the worker once either limit is reached
+    llm_recipe_concurrency: int = 8
+    llm_recipe_rate: float = 0
+    llm_parser_concurrency: int = 4
+    llm_parser_rate: float = 0
+    # Seconds per attempt (per chunk when streaming), then retries of timeouts
+    # and transient API errors after 1x, 2x, 4x... the backoff, jittered
+    llm_timeout: float = 60
+    llm_retries: int = 2
+    llm_retry_backoff: float = 1.0
+    # Seconds a user's recipes stay in the in-process ingredient index before
+    # they are reloaded, which bounds how long other workers' writes are missed
+    recipe_index_ttl: int = 300
+    # Recipe suggestion cache, keyed on (user, normalized query, pantry hash)
+    suggestion_cache_size: int = 1024
+    suggestion_cache_ttl: int = 3600
+    # Per-user pantry cache. Writes made through this process update it in
+    # place; the TTL bounds how long other workers' writes stay invisible
+    inventory_cache_size: int = 10000
+    inventory_cache_ttl: int = 300
+    # Ingredients expiring within this many days are flagged as "use soon"
+    expiry_horizon_days: float = 3
+    # Pantry items listed in a chat prompt; mentioned and expiring ones first
+    prompt_max_ingredients: int = 50
+    # Token budgets (tiktoken) for the parts of LLM prompts
+    prompt_query_tokens: int = 200
+    prompt_ingredient_tokens: int = 300
+    prompt_recipe_tokens: int = 1200
+    # OCR or pasted text handed to the recipe parser
+    prompt_text_tokens: int = 2500
+    # Add a Server-Timing header (app, supabase, llm, vector_store) to responses
+    metrics_server_timing: bool = False
+    # Owner of all data until requests are authenticated; must be a UUID4
+    default_user_id: str = "00000000-0000-4000-8000-000000000000"
 
     class Config:
         env_file = ".env"
 
-def get_settings():
-    return Settings()
\ No newline at end of file
+@lru_cache
+def get_settings() -> Settings:
+    """Settings parsed once per process from the environment and .env"""
+    return Settings()
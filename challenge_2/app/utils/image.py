@@ -0,0 +1,18 @@
+from PIL import Image, ImageOps
+import pytesseract
+
+def prepare_for_ocr(path: str, max_side: int) -> Image.Image:
+    """Decode an upload into an upright greyscale image no larger than `max_side`"""
+    image = Image.open(path)
+    # JPEGs are decoded straight to greyscale and scaled down by up to 8x in
+    # the decoder, so a full-resolution RGB copy of the photo never exists
+    image.draft("L", (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("L")
+    # Tesseract gains nothing from phone-camera resolutions but pays for every pixel
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    return image
+
+def extract_text(path: str, max_side: int) -> str:
+    """OCR the text of a recipe photo stored at `path`"""
+    return pytesseract.image_to_string(prepare_for_ocr(path, max_side))
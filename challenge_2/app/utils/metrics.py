@@ -0,0 +1,236 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import bisect
+import threading
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+
+# Latency buckets in seconds, from PostgREST round-trips up to LLM completions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _add(self, labels: Tuple[str, ...], amount: float):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [
+                f"{self.name}{_labels(self.labelnames, labels)} {value}"
+                for labels, value in self._values.items()
+            ]
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+            *self._samples()
+        ]
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._add(labels, amount)
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._add(labels, amount)
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self._add(labels, -amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+    def set_function(self, function: Callable[[], float], *labels: str):
+        """Take the value from `function` each time metrics are rendered"""
+        with self._lock:
+            self._functions[labels] = function
+
+    def _samples(self) -> List[str]:
+        for labels, function in list(self._functions.items()):
+            self.set(function(), *labels)
+        return super()._samples()
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> (count per bucket plus a final +Inf bucket, [sum of observations])
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for labels, (counts, total) in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (le,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total[0]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+REGISTRY: List[_Metric] = []
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "Requests currently being handled", ("method", "route")
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency until the response completes",
+    ("method", "route", "status")
+)
+span_duration = Histogram(
+    "span_duration_seconds", "Latency of calls to backing services",
+    ("kind", "operation")
+)
+inventory_cache_lookups = Counter(
+    "inventory_cache_lookups_total", "Pantry reads answered from memory (hit) or the database (miss)",
+    ("result",)
+)
+inventory_cache_users = Gauge("inventory_cache_users", "Users whose pantry is cached")
+inventory_cache_bytes = Gauge("inventory_cache_bytes", "Approximate memory held by cached pantries")
+llm_tokens = Counter(
+    "llm_tokens_total", "Prompt and completion tokens sent to and received from LLMs",
+    ("llm", "model", "type")
+)
+llm_queue_depth = Gauge("llm_queue_depth", "LLM calls waiting for a concurrency or rate slot", ("llm",))
+llm_in_flight = Gauge("llm_requests_in_flight", "LLM calls holding a concurrency slot", ("llm",))
+llm_coalesced = Counter(
+    "llm_coalesced_total", "LLM calls answered by joining an identical call already in flight", ("llm",)
+)
+llm_retries = Counter(
+    "llm_retries_total", "LLM call attempts retried after a timeout or transient error", ("llm", "reason")
+)
+
+# Spans recorded while handling the current request, for Server-Timing
+_request_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_spans", default=None)
+
+def record_span(kind: str, operation: str, duration: float):
+    span_duration.observe(duration, kind, operation)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((kind, duration))
+
+@contextmanager
+def span(kind: str, operation: str):
+    """Time a call to a backing service (`kind` is e.g. "supabase" or "llm")"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(kind, operation, time.perf_counter() - start)
+
+def _route_template(scope) -> str:
+    """Path template of the matching route, so ids do not explode label cardinality"""
+    # As Starlette's router: a full match wins, else the first partial one
+    # (right path, wrong method), which is the route that answers 405
+    partial = None
+    for route in scope["app"].routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "unmatched"
+
+def _server_timing(spans: List[Tuple[str, float]], total: float) -> str:
+    totals: Dict[str, List[float]] = {}
+    for kind, duration in spans:
+        totals.setdefault(kind, []).append(duration)
+    entries = [f"app;dur={total * 1000:.1f}"]
+    for kind, durations in totals.items():
+        entries.append(f'{kind};dur={sum(durations) * 1000:.1f};desc="{len(durations)} calls"')
+    return ", ".join(entries)
+
+class MetricsMiddleware:
+    """Per-route latency histogram and in-flight gauge.
+
+    Written as plain ASGI middleware so streaming responses pass through
+    untouched. With `server_timing`, each response carries a Server-Timing
+    header summing the spans recorded before its headers were sent.
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, route = scope["method"], _route_template(scope)
+        spans: List[Tuple[str, float]] = []
+        token = _request_spans.set(spans)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", _server_timing(spans, time.perf_counter() - start))
+            await send(message)
+
+        http_requests_in_flight.inc(method, route)
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            http_requests_in_flight.dec(method, route)
+            http_request_duration.observe(time.perf_counter() - start, method, route, str(status))
+            _request_spans.reset(token)
@@ -0,0 +1,71 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional
+import orjson
+from pydantic import BaseModel
+from starlette.responses import Response
+
+NDJSON = "application/x-ndjson"
+
+def _all_fields(model: BaseModel) -> dict:
+    # Same output as FastAPI's default response_model pass, in declaration order
+    return model.__dict__
+
+def _set_fields(model: BaseModel) -> dict:
+    # Same output as response_model_exclude_unset
+    fields_set = model.__fields_set__
+    return {name: value for name, value in model.__dict__.items() if name in fields_set}
+
+def _default(model_fields: Callable[[BaseModel], dict]) -> Callable[[Any], Any]:
+    def default(value: Any):
+        if isinstance(value, BaseModel):
+            return model_fields(value)
+        raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+    return default
+
+_DEFAULTS = {False: _default(_all_fields), True: _default(_set_fields)}
+
+def dumps(content: Any, exclude_unset: bool = False) -> bytes:
+    """JSON for `content`, including pydantic models, datetimes and UUIDs.
+
+    With `exclude_unset`, models leave out fields that were never set, as
+    with the route option of that name.
+    """
+    return orjson.dumps(content, default=_DEFAULTS[exclude_unset])
+
+class ModelResponse(Response):
+    """JSON response for models the service has already validated.
+
+    Returning it from an endpoint skips FastAPI's response_model pass,
+    which would validate every row a second time and then walk it again
+    with jsonable_encoder. Keep `response_model` on the route for the docs,
+    and pass `exclude_unset` where the route had response_model_exclude_unset.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, content: Any, exclude_unset: bool = False, **kwargs):
+        self.exclude_unset = exclude_unset
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content, self.exclude_unset)
+
+def ndjson_lines(models: List[BaseModel], exclude_unset: bool = False) -> bytes:
+    return b"".join(dumps(model, exclude_unset) + b"\n" for model in models)
+
+async def ndjson_pages(
+    first_page: List[BaseModel],
+    fetch: Callable[[int], Awaitable[List[BaseModel]]],
+    limit: int,
+    exclude_unset: bool = False
+) -> AsyncIterator[bytes]:
+    """Yield `first_page` and every page after it as NDJSON.
+
+    `fetch(cursor)` returns the page after the row with id `cursor`; pages
+    are requested until one comes back short, so only one is held at a time.
+    """
+    page: Optional[List[BaseModel]] = first_page
+    while page:
+        yield ndjson_lines(page, exclude_unset)
+        if len(page) < limit:
+            return
+        page = await fetch(page[-1].id)
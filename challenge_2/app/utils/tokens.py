@@ -0,0 +1,62 @@
+from functools import lru_cache
+from typing import Iterable, List, Optional
+import logging
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def encoding_for(model_name: str) -> Optional[tiktoken.Encoding]:
+    """tiktoken encoding of a model, or None if it cannot be loaded.
+
+    Encodings are downloaded on first use, so an offline worker may not have
+    them; token counting then degrades to None instead of failing requests.
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"No tiktoken encoding for {model_name}, token counts disabled: {e}")
+        return None
+
+def count_tokens(text: str, model_name: str) -> Optional[int]:
+    encoding = encoding_for(model_name)
+    if encoding is None:
+        return None
+    return len(encoding.encode(text, disallowed_special=()))
+
+def estimate_tokens(text: str, model_name: str) -> int:
+    """Exact count with the model's encoding, else about four characters a token"""
+    tokens = count_tokens(text, model_name)
+    return tokens if tokens is not None else -(-len(text) // 4)
+
+def truncate_to_tokens(text: str, budget: int, model_name: str) -> str:
+    """`text` cut to roughly `budget` tokens at a word boundary, marked with "..." """
+    encoding = encoding_for(model_name)
+    if encoding is None:
+        if len(text) <= budget * 4:
+            return text
+        cut = text[:budget * 4]
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= budget:
+            return text
+        cut = encoding.decode(tokens[:budget])
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut + " ..."
+
+def fit_to_tokens(items: Iterable[str], budget: int, model_name: str, separator: str = ", ") -> List[str]:
+    """The longest prefix of `items` that, joined by `separator`, fits in `budget` tokens"""
+    separator_tokens = estimate_tokens(separator, model_name)
+    fitted: List[str] = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(item, model_name) + (separator_tokens if fitted else 0)
+        if used + cost > budget:
+            break
+        fitted.append(item)
+        used += cost
+    return fitted
@@ -0,0 +1,69 @@
+from typing import BinaryIO, Dict, Tuple
+import hashlib
+import os
+import tempfile
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+CHUNK_SIZE = 1024 * 1024
+
+def _too_large(limit: int) -> str:
+    return f"Upload exceeds the {limit / (1024 * 1024):.3g} MB limit"
+
+class UploadLimitMiddleware:
+    """Answer 413 to request bodies larger than the limit of their path.
+
+    A declared Content-Length over the limit is refused before any of the
+    body is read; bodies without one are counted as they arrive and cut off
+    once they pass it.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        declared = headers.get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            response = JSONResponse({"detail": _too_large(limit)}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Surfaces through the form parser as the response
+                    raise HTTPException(status_code=413, detail=_too_large(limit))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+def spool_upload(source: BinaryIO, directory: str = None) -> Tuple[str, str]:
+    """Copy an upload to a file of its own in chunks, hashing it on the way.
+
+    Blocking; run it on a thread. Returns the new file's path and the hex
+    SHA-256 of its contents. The caller owns the file and must remove it.
+    """
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(prefix="upload-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as target:
+            source.seek(0)
+            while chunk := source.read(CHUNK_SIZE):
+                digest.update(chunk)
+                target.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, digest.hexdigest()
@@ -0,0 +1,114 @@
+"""Peak memory and time of handling large recipe photos.
+
+Writes synthetic photo-like JPEGs at each size and measures, each in a fresh
+process so peak RSS belongs to that step alone:
+
+- `read_upload`: reading the whole upload into memory (the old handler);
+- `spool_upload`: copying it to its own file in chunks while hashing;
+- `decode_full`: decoding from bytes at full resolution and in colour,
+  then converting and downscaling for OCR (the old `prepare_for_ocr`);
+- `decode_draft`: `prepare_for_ocr` as it is now, which asks the JPEG
+  decoder for a reduced greyscale image up front.
+
+Peak RSS is reported above the process's RSS after imports; it is read
+from /proc, so this only runs on Linux.
+
+    python -m benchmarks.bench_image --megapixels 12 48 --max-side 2000
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+def _photo(path: str, megapixels: float, quality: int):
+    """A noisy gradient, which compresses about as badly as a real photo"""
+    from PIL import Image
+
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    noise = Image.effect_noise((width, height), 40)
+    gradient = Image.linear_gradient("L").resize((width, height))
+    Image.merge("RGB", (noise, gradient, Image.blend(noise, gradient, 0.5))).save(path, "JPEG", quality=quality)
+
+def _read_upload(path: str, max_side: int):
+    with open(path, "rb") as f:
+        return len(f.read())
+
+def _spool_upload(path: str, max_side: int):
+    from app.utils.uploads import spool_upload
+
+    with open(path, "rb") as f:
+        copy, _ = spool_upload(f)
+    os.unlink(copy)
+
+def _decode_full(path: str, max_side: int):
+    from PIL import Image, ImageOps
+
+    with open(path, "rb") as f:
+        contents = f.read()
+    image = Image.open(io.BytesIO(contents))
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("L")
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    return image.size
+
+def _decode_draft(path: str, max_side: int):
+    from app.utils.image import prepare_for_ocr
+
+    return prepare_for_ocr(path, max_side).size
+
+STEPS = {
+    "read_upload": _read_upload,
+    "spool_upload": _spool_upload,
+    "decode_full": _decode_full,
+    "decode_draft": _decode_draft
+}
+
+def _status_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+def _measure(step: str, path: str, max_side: int) -> dict:
+    # Imports count towards the baseline, not the step
+    import PIL.Image  # noqa: F401
+    import app.utils.image  # noqa: F401
+    import app.utils.uploads  # noqa: F401
+
+    # Reset the peak (VmHWM) to the current RSS; Linux only
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    baseline = _status_kb("VmRSS")
+    start = time.perf_counter()
+    STEPS[step](path, max_side)
+    elapsed = time.perf_counter() - start
+    peak = _status_kb("VmHWM")
+    return {"peak_rss_mb": round((peak - baseline) / 1024, 1), "ms": round(elapsed * 1000, 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[12, 48])
+    parser.add_argument("--max-side", type=int, default=2000, help="OCR_MAX_SIDE")
+    parser.add_argument("--quality", type=int, default=90)
+    parser.add_argument("--steps", nargs="+", choices=list(STEPS), default=list(STEPS))
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="bench-image-") as directory:
+        for megapixels in args.megapixels:
+            path = os.path.join(directory, f"{megapixels}mp.jpg")
+            _photo(path, megapixels, args.quality)
+            result = {"megapixels": megapixels, "file_mb": round(os.path.getsize(path) / 2**20, 1)}
+            for step in args.steps:
+                # A fresh process per step, so each peak is its own
+                with context.Pool(1) as pool:
+                    result[step] = pool.apply(_measure, (step, path, args.max_side))
+            print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
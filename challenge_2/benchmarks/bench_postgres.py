@@ -0,0 +1,160 @@
+"""Recipe storage over PostgREST versus direct Postgres.
+
+Seeds the same recipes and ingredients through both `RecipeService`
+backends and drives each operation at rising concurrency, reporting
+throughput and latency percentiles as one JSON line per backend, operation
+and level. The Postgres side needs a reachable database; the tables are
+created if missing and only rows of a throwaway user are written and
+removed again. The PostgREST side talks to the in-memory fake from
+``benchmarks.fakes`` unless ``--postgrest-url`` points at a real PostgREST
+in front of the same database, so by default it is a lower bound on the
+HTTP path's cost: no database work happens behind it.
+
+    python -m benchmarks.bench_postgres --database-url postgresql://postgres@127.0.0.1/postgres \\
+        --sslmode disable --concurrency 1 16 64
+
+Vector store writes are skipped on both sides.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+from typing import Callable, Dict, List
+
+OPERATIONS = [
+    "get_recipe", "list_recipes", "list_summaries", "create_recipe", "update_recipe",
+    "list_ingredients", "create_ingredient"
+]
+
+def _operations(service, user_id: str, recipe_ids: List[int], rng: random.Random) -> Dict[str, Callable]:
+    from app.models.schemas import IngredientCreate, RecipeCreate
+    from benchmarks.bench_load import _ingredient_payload, _recipe_payload
+
+    return {
+        "get_recipe": lambda: service.get_recipe(rng.choice(recipe_ids), user_id),
+        "list_recipes": lambda: service.get_recipes(user_id, limit=50),
+        "list_summaries": lambda: service.get_recipes(
+            user_id, limit=50, fields=["name", "cuisine_type", "cooking_time"]
+        ),
+        "create_recipe": lambda: service.create_recipe(RecipeCreate(**_recipe_payload(rng)), user_id),
+        "update_recipe": lambda: service.update_recipe(
+            rng.choice(recipe_ids), RecipeCreate(**_recipe_payload(rng)), user_id
+        ),
+        "list_ingredients": lambda: service.get_ingredients(user_id),
+        "create_ingredient": lambda: service.add_ingredient(IngredientCreate(**_ingredient_payload(rng)), user_id)
+    }
+
+async def _seed(service, user_id: str, recipes: int, ingredients: int, rng: random.Random) -> List[int]:
+    from app.models.schemas import IngredientCreate, RecipeCreate
+    from benchmarks.bench_load import _ingredient_payload, _recipe_payload
+
+    created = await service._create_recipe_chunk(
+        [RecipeCreate(**_recipe_payload(rng)) for _ in range(recipes)], user_id
+    )
+    for _ in range(ingredients):
+        await service.add_ingredient(IngredientCreate(**_ingredient_payload(rng)), user_id)
+    return [recipe.id for recipe in created]
+
+async def run_level(call: Callable, concurrency: int, total: int) -> dict:
+    """Await `call()` `total` times from `concurrency` concurrent clients"""
+    from benchmarks.bench_load import _summary
+
+    remaining = iter(range(total))
+    latencies: List[float] = []
+
+    async def client():
+        for _ in remaining:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {"throughput_ops": round(total / elapsed, 1), "latency": _summary(latencies)}
+
+async def _cleanup(user_id: str):
+    from sqlalchemy import delete
+    from app.database import get_async_engine
+    from app.services.postgres_recipe_service import ingredients, recipes
+
+    async with get_async_engine().begin() as connection:
+        await connection.execute(delete(recipes).where(recipes.c.user_id == user_id))
+        await connection.execute(delete(ingredients).where(ingredients.c.user_id == user_id))
+
+async def benchmark(args) -> List[dict]:
+    from app.database import get_async_engine
+    from app.services.postgres_recipe_service import PostgresRecipeService, metadata
+    from app.services.recipe_service import RecipeService
+
+    async def skip_embedding(recipes, user_id):
+        pass
+
+    RecipeService._embed_recipes = staticmethod(skip_embedding)
+
+    async with get_async_engine().begin() as connection:
+        await connection.run_sync(metadata.create_all)
+
+    user_id = str(uuid.uuid4())
+    backends = {"postgrest": RecipeService(), "postgres": PostgresRecipeService()}
+    results = []
+    try:
+        for backend, service in backends.items():
+            rng = random.Random(args.seed)
+            recipe_ids = await _seed(service, user_id, args.seed_recipes, args.seed_ingredients, rng)
+            operations = _operations(service, user_id, recipe_ids, rng)
+            for operation in args.operations:
+                for concurrency in args.concurrency:
+                    result = {"backend": backend, "operation": operation, "concurrency": concurrency}
+                    result.update(await run_level(operations[operation], concurrency, args.requests))
+                    results.append(result)
+                    print(json.dumps(result))
+    finally:
+        await _cleanup(user_id)
+        await backends["postgres"].close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--sslmode", default="disable")
+    parser.add_argument("--postgrest-url", help="Supabase URL to use instead of the in-memory fake")
+    parser.add_argument("--postgrest-key", default="bench.bench.bench")
+    parser.add_argument("--db-latency-ms", type=float, default=0, help="Delay of the fake PostgREST")
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=400, help="Calls per operation and level")
+    parser.add_argument("--seed-recipes", type=int, default=200)
+    parser.add_argument("--seed-ingredients", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the full report to this file")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+
+    supabase = None
+    if args.postgrest_url is None:
+        from benchmarks.fakes import FakeSupabase
+
+        supabase = FakeSupabase(args.db_latency_ms / 1000).start()
+    os.environ["SUPABASE_URL"] = args.postgrest_url or supabase.url
+    os.environ["SUPABASE_KEY"] = args.postgrest_key
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["DATABASE_SSLMODE"] = args.sslmode
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+    os.environ["VECTOR_STORE_PATH"] = tempfile.mkdtemp(prefix="bench-vector-store-")
+
+    results = asyncio.run(benchmark(args))
+
+    if supabase is not None:
+        supabase.shutdown()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"options": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
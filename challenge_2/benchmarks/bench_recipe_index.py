@@ -0,0 +1,78 @@
+"""Benchmark for the in-process ingredient -> recipe index.
+
+Builds a RecipeIndex over synthetic recipes for one user and times the full
+build, incremental updates and pantry matching.
+
+    python -m benchmarks.bench_recipe_index --recipes 100000 --pantry 40
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from types import SimpleNamespace
+from app.services.recipe_index import RecipeIndex, build_pantry
+
+USER_ID = "00000000-0000-0000-0000-000000000000"
+UNITS = ["grams", "ml", "pieces", "cups", "tbsp"]
+
+def synthetic_recipe(rng: random.Random, vocabulary):
+    return [
+        SimpleNamespace(
+            ingredient_name=name,
+            quantity=rng.randint(1, 500),
+            unit=rng.choice(UNITS)
+        )
+        for name in rng.sample(vocabulary, rng.randint(4, 15))
+    ]
+
+def percentile(samples, pct):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--vocabulary", type=int, default=2_000)
+    parser.add_argument("--pantry", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Zipf-ish vocabulary: a few staples appear in most recipes
+    vocabulary = [f"ingredient {i}" for i in range(args.vocabulary)]
+    weighted = vocabulary[:50] * 20 + vocabulary
+    recipes = [synthetic_recipe(rng, weighted) for _ in range(args.recipes)]
+
+    index = RecipeIndex()
+    start = time.perf_counter()
+    for recipe_id, ingredients in enumerate(recipes):
+        index.add(recipe_id, USER_ID, f"recipe {recipe_id}", ingredients)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for recipe_id in range(1000):
+        index.add(recipe_id, USER_ID, f"recipe {recipe_id}", synthetic_recipe(rng, weighted))
+    update_us = (time.perf_counter() - start) / 1000 * 1e6
+
+    latencies = []
+    for _ in range(args.queries):
+        pantry = build_pantry(
+            SimpleNamespace(name=name, quantity=rng.randint(1, 1000), unit=rng.choice(UNITS))
+            for name in rng.sample(weighted, args.pantry)
+        )
+        start = time.perf_counter()
+        index.match(USER_ID, pantry, limit=10)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    print(json.dumps({
+        "recipes": args.recipes,
+        "pantry_size": args.pantry,
+        "build_seconds": round(build_seconds, 2),
+        "update_us": round(update_us, 1),
+        "match_ms_p50": round(statistics.median(latencies), 2),
+        "match_ms_p99": round(percentile(latencies, 99), 2)
+    }))
+
+if __name__ == "__main__":
+    main()
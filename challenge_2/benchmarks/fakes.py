@@ -0,0 +1,322 @@
+"""Local stand-ins for the services behind the API, for load tests.
+
+`FakeSupabase` is an in-memory PostgREST server covering the subset of the
+protocol `RecipeService` uses: filters, ordering, limits, embedded
+`recipe_ingredients`, representations on writes and single-object reads.
+`FakeChatModel` replaces ChatOpenAI with canned answers. Both wait a
+configurable time per call so the app can be measured against realistic
+backends without network access or API keys.
+"""
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+from langchain.chat_models.base import BaseChatModel
+from langchain.schema import ChatResult
+from langchain.schema.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain.schema.output import ChatGeneration, ChatGenerationChunk
+
+# Embedded resource -> column referencing the parent row; children are
+# deleted with their parent, like the ON DELETE CASCADE in the schema
+FOREIGN_KEYS = {"recipe_ingredients": ("recipes", "recipe_id")}
+
+Select = Tuple[List[str], Dict[str, "Select"]]
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, current = [], 0, ""
+    for char in text:
+        if char == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current += char
+    parts.append(current)
+    return [part.strip() for part in parts if part.strip()]
+
+def parse_select(select: str) -> Select:
+    """Columns and embedded resources of a PostgREST select clause"""
+    columns, embeds = [], {}
+    for part in _split_top_level(select):
+        if "(" in part:
+            name, inner = part.split("(", 1)
+            embeds[name.strip()] = parse_select(inner[:-1])
+        else:
+            columns.append(part)
+    return columns, embeds
+
+def _text(value: Any) -> str:
+    if isinstance(value, bool):
+        return str(value).lower()
+    return "null" if value is None else str(value)
+
+def _compare(actual: Any, value: str) -> int:
+    if actual is None:
+        return -1
+    try:
+        left, right = float(actual), float(value)
+    except (TypeError, ValueError):
+        left, right = str(actual), value
+    return (left > right) - (left < right)
+
+def _like(pattern: str) -> "re.Pattern":
+    # PostgREST turns `*` into `%`; the rest follows LIKE, escaped by backslash
+    tokens = re.findall(r"\\.|.", pattern.replace("*", "%"), re.DOTALL)
+    wildcards = {"%": ".*", "_": "."}
+    regex = "".join(
+        re.escape(token[1]) if token.startswith("\\") else wildcards.get(token, re.escape(token))
+        for token in tokens
+    )
+    return re.compile("^" + regex + "$", re.IGNORECASE | re.DOTALL)
+
+class FakeDatabase:
+    """Tables of rows keyed by id, with the filters PostgREST offers"""
+
+    def __init__(self):
+        self.tables: Dict[str, Dict[int, dict]] = defaultdict(dict)
+        # (child table, parent id) -> child rows by id, for embedding
+        self._children: Dict[Tuple[str, int], Dict[int, dict]] = defaultdict(dict)
+        self._next_id: Dict[str, int] = defaultdict(lambda: 1)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _matches(row: dict, filters: List[Tuple[str, str, str]]) -> bool:
+        for column, op, value in filters:
+            actual = row.get(column)
+            if op == "eq":
+                ok = _text(actual) == value
+            elif op == "neq":
+                ok = _text(actual) != value
+            elif op == "in":
+                ok = _text(actual) in value.strip("()").split(",")
+            elif op == "ilike":
+                ok = actual is not None and bool(_like(value).match(str(actual)))
+            elif op == "is":
+                ok = _text(actual) == value
+            else:
+                result = _compare(actual, value)
+                ok = {"gt": result > 0, "gte": result >= 0, "lt": result < 0, "lte": result <= 0}[op]
+            if not ok:
+                return False
+        return True
+
+    def select(self, table: str, filters, order: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        rows = [row for row in self.tables[table].values() if self._matches(row, filters)]
+        if order:
+            column, _, direction = order.partition(".")
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column)),
+                      reverse=direction.startswith("desc"))
+        return rows[:limit] if limit is not None else rows
+
+    def project(self, table: str, row: dict, select: Select) -> dict:
+        columns, embeds = select
+        result = dict(row) if "*" in columns else {column: row.get(column) for column in columns}
+        for name, inner in embeds.items():
+            children = self._children[(name, row["id"])].values()
+            result[name] = [self.project(name, child, inner) for child in children]
+        return result
+
+    def insert(self, table: str, rows: List[dict]) -> List[dict]:
+        created = []
+        for values in rows:
+            row = {"id": self._next_id[table], **values}
+            self._next_id[table] = max(self._next_id[table], row["id"]) + 1
+            self.tables[table][row["id"]] = row
+            if table in FOREIGN_KEYS:
+                _, column = FOREIGN_KEYS[table]
+                self._children[(table, row[column])][row["id"]] = row
+            created.append(row)
+        return created
+
+    def update(self, table: str, filters, values: dict) -> List[dict]:
+        rows = self.select(table, filters)
+        for row in rows:
+            row.update(values)
+        return rows
+
+    def delete(self, table: str, filters) -> List[dict]:
+        rows = self.select(table, filters)
+        for row in rows:
+            self._remove(table, row)
+        return rows
+
+    def _remove(self, table: str, row: dict):
+        del self.tables[table][row["id"]]
+        if table in FOREIGN_KEYS:
+            _, column = FOREIGN_KEYS[table]
+            self._children[(table, row[column])].pop(row["id"], None)
+        for child, (parent, _) in FOREIGN_KEYS.items():
+            if parent == table:
+                for child_row in list(self._children.pop((child, row["id"]), {}).values()):
+                    del self.tables[child][child_row["id"]]
+
+class _PostgRESTHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "FakeSupabase"
+
+    def _respond(self, status: int, payload: Any = None):
+        body = b"" if payload is None else json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        # postgrest-py sends a JSON body even on GET; always drain it so the
+        # keep-alive connection stays in sync
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.server.latency)
+
+        url = urlsplit(self.path)
+        table = url.path.rstrip("/").rsplit("/", 1)[-1]
+        select, order, limit, filters = "*", None, None, []
+        for key, value in parse_qsl(url.query, keep_blank_values=True):
+            if key == "select":
+                select = value
+            elif key == "order":
+                order = value
+            elif key == "limit":
+                limit = int(value)
+            elif key != "offset":
+                op, _, operand = value.partition(".")
+                filters.append((key, op, operand))
+
+        database = self.server.database
+        with database.lock:
+            self.server.requests.append((self.command, table))
+            if self.command == "GET":
+                rows = database.select(table, filters, order, limit)
+            elif self.command == "POST":
+                payload = json.loads(raw or b"[]")
+                rows = database.insert(table, payload if isinstance(payload, list) else [payload])
+            elif self.command == "PATCH":
+                rows = database.update(table, filters, json.loads(raw or b"{}"))
+            else:
+                rows = database.delete(table, filters)
+            result = [database.project(table, row, parse_select(select)) for row in rows]
+
+        if self.command != "GET" and "return=minimal" in self.headers.get("Prefer", ""):
+            self._respond(201 if self.command == "POST" else 204)
+        elif "vnd.pgrst.object" in self.headers.get("Accept", ""):
+            if len(result) == 1:
+                self._respond(200, result[0])
+            else:
+                self._respond(406, {
+                    "code": "PGRST116",
+                    "details": f"The result contains {len(result)} rows",
+                    "hint": None,
+                    "message": "JSON object requested, multiple (or no) rows returned"
+                })
+        else:
+            self._respond(201 if self.command == "POST" else 200, result)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeSupabase(ThreadingHTTPServer):
+    """In-memory PostgREST answering every request after `latency` seconds.
+
+    Every request is recorded in `requests` as (method, table), so round
+    trips can be counted.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _PostgRESTHandler)
+        self.latency = latency
+        self.database = FakeDatabase()
+        self.requests: List[Tuple[str, str]] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self) -> "FakeSupabase":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+PARSED_RECIPE = json.dumps({
+    "name": "Tomato Egg Curry",
+    "cuisine_type": "Indian",
+    "preparation_time": 10,
+    "cooking_time": 25,
+    "difficulty_level": "Easy",
+    "taste_profile": "Spicy",
+    "instructions": "Boil the eggs. Fry onion and tomato with the spices. Simmer the eggs in the sauce.",
+    "ingredients": [
+        {"ingredient_name": "Egg", "quantity": 4, "unit": "pieces"},
+        {"ingredient_name": "Tomato", "quantity": 2, "unit": "pieces"},
+        {"ingredient_name": "Onion", "quantity": 1, "unit": "pieces"}
+    ]
+})
+
+RECIPE_DETAILS = json.dumps({
+    "cuisine_type": "Indian",
+    "preparation_time": 10,
+    "cooking_time": 25,
+    "difficulty_level": "Easy",
+    "taste_profile": "Spicy"
+})
+
+SUGGESTIONS = """Here are a few recipes you can make with what you have:
+
+- **Tomato Egg Curry** (35 minutes, easy)
+  - Uses: egg, tomato, onion
+  - Also needed: garam masala
+  - A quick, filling dinner that matches your request.
+- **Vegetable Fried Rice** (25 minutes, easy)
+  - Uses: rice, carrot, peas, egg
+  - Also needed: soy sauce
+  - Good way to use up leftover rice and vegetables.
+"""
+
+class FakeChatModel(BaseChatModel):
+    """ChatOpenAI stand-in that answers after `latency` seconds.
+
+    Recipe extraction and enrichment prompts get valid JSON, anything else a
+    fixed suggestion text. Streams emit one word every `token_latency`
+    seconds after the first-token delay.
+    """
+
+    model_name: str = "gpt-3.5-turbo"
+    temperature: float = 0.7
+    latency: float = 0.5
+    token_latency: float = 0.01
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-openai-chat"
+
+    @staticmethod
+    def _answer(messages: List[BaseMessage]) -> str:
+        prompt = messages[-1].content
+        if "Extract structured recipe information" in prompt:
+            return PARSED_RECIPE
+        if "fill in the missing information" in prompt:
+            return RECIPE_DETAILS
+        return SUGGESTIONS
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(messages)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(messages)))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for word in re.findall(r"\S+\s*", self._answer(messages)):
+            await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
@@ -0,0 +1,38 @@
+import time
+import uuid
+
+import httpx
+
+from benchmarks.bench_load import install_fakes, start_app
+
+LLM_LATENCY = 0.05
+TOKEN_LATENCY = 0.01
+
+def test_first_token_arrives_before_the_full_completion(app):
+    # TestClient buffers streamed bodies, so this needs a real server
+    install_fakes(llm_latency=LLM_LATENCY, token_latency=TOKEN_LATENCY, ocr_latency=0.0)
+    base_url, stop = start_app(app)
+    try:
+        events = []
+        start = time.perf_counter()
+        with httpx.stream(
+            "POST", f"{base_url}/chat/", timeout=30,
+            # A fresh question, so no cached answer is replayed in one piece
+            json={"message": f"What can I cook tonight? {uuid.uuid4()}", "stream": True}
+        ) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            for line in response.iter_lines():
+                if line.startswith("event: "):
+                    events.append((line[len("event: "):], time.perf_counter() - start))
+    finally:
+        stop()
+
+    names = [name for name, _ in events]
+    assert names[-1] == "done"
+    tokens = [at for name, at in events if name == "token"]
+    assert len(tokens) > 10
+    first_token, done = tokens[0], events[-1][1]
+    # The fake model takes TOKEN_LATENCY per word; a buffered response
+    # would deliver every event at once, right before `done`
+    assert done - first_token >= (len(tokens) - 1) * TOKEN_LATENCY * 0.5
@@ -0,0 +1,16 @@
+import asyncio
+
+from app.services.image_jobs import ImageJobQueue
+
+def test_stop_before_start_and_twice():
+    async def scenario():
+        queue = ImageJobQueue(workers=1, maxsize=1, ttl=60)
+        await queue.stop()
+        queue.start()
+        await queue.stop()
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert queue.depth == 0
+    assert queue._ocr_executor is None
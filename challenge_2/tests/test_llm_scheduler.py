@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+
+from app.services.llm_scheduler import LLMScheduler, is_transient
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+def _status_error(cls, status: int) -> openai.APIStatusError:
+    return cls("error", response=httpx.Response(status, request=REQUEST), body=None)
+
+def _attempts(error: Exception) -> int:
+    calls = []
+
+    async def call():
+        calls.append(1)
+        raise error
+
+    scheduler = LLMScheduler("test", concurrency=1, retries=2, backoff=0)
+    with pytest.raises(type(error)):
+        asyncio.run(scheduler.run(call))
+    return len(calls)
+
+@pytest.mark.parametrize("error", [
+    _status_error(openai.BadRequestError, 400),
+    _status_error(openai.AuthenticationError, 401),
+    _status_error(openai.PermissionDeniedError, 403),
+    _status_error(openai.NotFoundError, 404),
+    _status_error(openai.UnprocessableEntityError, 422),
+    ValueError("bad prompt")
+])
+def test_permanent_errors_are_not_retried(error):
+    assert not is_transient(error)
+    assert _attempts(error) == 1
+
+@pytest.mark.parametrize("error", [
+    _status_error(openai.RateLimitError, 429),
+    _status_error(openai.InternalServerError, 500),
+    _status_error(openai.APIStatusError, 503),
+    openai.APITimeoutError(REQUEST),
+    openai.APIConnectionError(request=REQUEST),
+    asyncio.TimeoutError()
+])
+def test_transient_errors_are_retried(error):
+    assert is_transient(error)
+    assert _attempts(error) == 3
+
+def test_identical_concurrent_calls_share_one_upstream_call():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def scenario():
+        scheduler = LLMScheduler("test", concurrency=4)
+        same = [scheduler.run(call, key="prompt") for _ in range(10)]
+        return await asyncio.gather(*same, scheduler.run(call, key="other"))
+
+    assert asyncio.run(scenario()) == ["answer"] * 11
+    assert len(calls) == 2
+
+def test_concurrency_limit():
+    running, peak = 0, 0
+
+    async def call():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    async def scenario():
+        scheduler = LLMScheduler("test", concurrency=3)
+        await asyncio.gather(*(scheduler.run(call) for _ in range(12)))
+
+    asyncio.run(scenario())
+    assert peak == 3
+
+def test_token_bucket_limits_the_rate():
+    started = []
+
+    async def call():
+        started.append(time.monotonic())
+
+    async def scenario():
+        # A burst of `rate`, then one call every 1 / rate seconds
+        scheduler = LLMScheduler("test", concurrency=10, rate=20)
+        await asyncio.gather(*(scheduler.run(call) for _ in range(30)))
+
+    asyncio.run(scenario())
+    elapsed = started[-1] - started[0]
+    assert 0.4 < elapsed < 1.5
+
+def test_scheduler_works_across_event_loops():
+    # The service (and its schedulers) outlives a test client's or reload's loop
+    scheduler = LLMScheduler("test", concurrency=1, rate=50)
+
+    async def call():
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def scenario():
+        # Contended, so callers wait on the semaphore and the bucket's lock
+        return await asyncio.gather(*(scheduler.run(call) for _ in range(3)), scheduler.run(call, key="prompt"))
+
+    for _ in range(2):
+        assert asyncio.run(scenario()) == ["answer"] * 4
@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from app.services import langchain_service, recipe_service
+from app.services.supabase_client import get_supabase
+
+def test_requests_share_the_startup_build(monkeypatch):
+    builds = []
+
+    def slow_build():
+        time.sleep(0.2)
+        builds.append(object())
+        return builds[-1]
+
+    monkeypatch.setattr(langchain_service, "get_langchain_service", slow_build)
+
+    async def scenario():
+        recipe_service.warm_up_langchain_service()
+        started = time.perf_counter()
+        # Requests arriving during the warmup wait for it without blocking the loop
+        services = await asyncio.gather(*(recipe_service.load_langchain_service() for _ in range(5)))
+        return services, time.perf_counter() - started
+
+    services, elapsed = asyncio.run(scenario())
+    assert len(builds) == 1
+    assert all(service is builds[0] for service in services)
+    assert elapsed < 1
+
+def test_failed_warmup_is_retried_and_does_not_skip_shutdown(app, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("no model")
+
+    monkeypatch.setattr(langchain_service, "ChatOpenAI", broken)
+    langchain_service.get_langchain_service.cache_clear()
+    with TestClient(app) as client:
+        response = client.post("/chat/", json={"message": "Dinner ideas?"})
+        assert response.status_code == 400
+    # The lifespan closed the clients even though the warmup failed
+    assert get_supabase.cache_info().currsize == 0
@@ -0,0 +1,17 @@
+import pytest
+
+from app.utils.metrics import _route_template
+
+def _scope(app, method: str, path: str) -> dict:
+    return {"type": "http", "app": app, "method": method, "path": path, "root_path": ""}
+
+@pytest.mark.parametrize("method, path, template", [
+    ("GET", "/recipes/match", "/recipes/match"),
+    # /recipes/match only allows GET, but is registered before the PUT route
+    ("PUT", "/recipes/match", "/recipes/{recipe_id}"),
+    ("DELETE", "/recipes/7", "/recipes/{recipe_id}"),
+    ("PATCH", "/recipes/7", "/recipes/{recipe_id}"),
+    ("GET", "/nowhere", "unmatched")
+])
+def test_route_template_prefers_full_matches(app, method, path, template):
+    assert _route_template(_scope(app, method, path)) == template
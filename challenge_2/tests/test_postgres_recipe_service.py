@@ -0,0 +1,92 @@
+"""PostgresRecipeService statements, recorded by a fake connection (no database needed)"""
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.sql import Delete, Insert, Update
+
+from app.models.schemas import RecipeCreate
+from app.services import postgres_recipe_service
+from app.services.postgres_recipe_service import PostgresRecipeService
+
+USER_ID = str(uuid.uuid4())
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def mappings(self):
+        return self
+
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+class _Connection:
+    def __init__(self, existing):
+        self.existing = existing
+        self.statements = []
+
+    async def execute(self, statement, parameters=None):
+        self.statements.append((statement, parameters))
+        if isinstance(statement, Update):
+            return _Result([{
+                "id": 1, "user_id": USER_ID, "name": "Omelette", "cuisine_type": None,
+                "preparation_time": None, "cooking_time": None, "difficulty_level": None,
+                "taste_profile": None, "instructions": "Whisk.", "is_vegetarian": True,
+                "vector_store_id": str(uuid.uuid4()), "average_rating": 0.0, "number_of_reviews": 0,
+                "created_at": datetime.now(timezone.utc), "ingredients": self.existing
+            }])
+        return _Result([])
+
+@pytest.fixture
+def use(monkeypatch):
+    """Route the service's transactions to a given fake connection"""
+    async def no_embedding(recipes, user_id):
+        pass
+
+    monkeypatch.setattr(PostgresRecipeService, "_embed_recipes", staticmethod(no_embedding))
+
+    def install(connection: _Connection):
+        @asynccontextmanager
+        async def transaction(operation):
+            yield connection
+
+        monkeypatch.setattr(postgres_recipe_service, "_transaction", transaction)
+
+    return install
+
+def test_update_recipe_writes_only_changed_ingredients(use):
+    connection = _Connection([
+        {"id": 10, "ingredient_name": "Egg", "quantity": 2, "unit": "pcs"},
+        {"id": 11, "ingredient_name": "Milk", "quantity": 50, "unit": "ml"},
+        {"id": 12, "ingredient_name": "Salt", "quantity": 1, "unit": "g"}
+    ])
+
+    use(connection)
+    recipe = RecipeCreate(name="Omelette", instructions="Whisk.", is_vegetarian=True, ingredients=[
+        {"ingredient_name": "Egg", "quantity": 2, "unit": "pcs"},
+        {"ingredient_name": "Salt", "quantity": 1, "unit": "g"},
+        {"ingredient_name": "Chives", "quantity": 5, "unit": "g"}
+    ])
+    updated = asyncio.run(PostgresRecipeService.update_recipe(1, recipe, USER_ID))
+
+    assert [i.ingredient_name for i in updated.ingredients] == ["Egg", "Salt", "Chives"]
+    kinds = [type(statement) for statement, _ in connection.statements]
+    assert kinds == [Update, Delete, Insert]
+    delete = connection.statements[1][0].compile()
+    assert list(delete.params.values())[-1] == [11]
+    assert connection.statements[2][1] == [
+        {"recipe_id": 1, "ingredient_name": "Chives", "quantity": 5.0, "unit": "g"}
+    ]
+
+def test_update_recipe_with_unchanged_ingredients_is_one_statement(use):
+    connection = _Connection([{"id": 10, "ingredient_name": "Egg", "quantity": 2, "unit": "pcs"}])
+
+    use(connection)
+    recipe = RecipeCreate(name="Omelette", instructions="Whisk.", ingredients=[
+        {"ingredient_name": "Egg", "quantity": 2.0, "unit": "pcs"}
+    ])
+    asyncio.run(PostgresRecipeService.update_recipe(1, recipe, USER_ID))
+    assert [type(statement) for statement, _ in connection.statements] == [Update]
@@ -0,0 +1,32 @@
+import random
+
+from app.services import recipe_service
+from benchmarks.bench_load import _recipe_payload
+
+def test_failed_chunk_cleanup_still_retries_per_recipe(client, supabase, monkeypatch, caplog):
+    execute = recipe_service.execute
+    failures = {"bulk ingredients": 1, "cleanup": 1}
+
+    async def flaky_execute(query):
+        if query.path.endswith("/recipe_ingredients") and query.http_method == "POST" \
+                and len(query.json) > 1 and failures["bulk ingredients"]:
+            failures["bulk ingredients"] -= 1
+            raise RuntimeError("ingredient insert timed out")
+        if query.path.endswith("/recipes") and query.http_method == "DELETE" and failures["cleanup"]:
+            failures["cleanup"] -= 1
+            raise RuntimeError("cleanup timed out")
+        return await execute(query)
+
+    monkeypatch.setattr(recipe_service, "execute", flaky_execute)
+    rng = random.Random(3)
+    payloads = [_recipe_payload(rng) for _ in range(3)]
+    response = client.post("/recipes/batch", json=payloads)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["created"], body["failed"], body["errors"]) == (3, 0, [])
+    # The first attempt's rows could not be removed, so they are reported
+    orphans = {row["id"] for row in supabase.database.select("recipes", [])} - set(body["recipe_ids"])
+    assert len(orphans) == 3
+    assert f"Failed to remove recipes {sorted(orphans)}" in caplog.text
+    assert failures == {"bulk ingredients": 0, "cleanup": 0}
@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from benchmarks.bench_load import _ingredient_payload, _recipe_payload
+
+@pytest.fixture
+def recipes(client):
+    rng = random.Random(5)
+    created = []
+    for cuisine, vegetarian in [("Italian", True), ("Italian", False), ("Thai", None)]:
+        payload = dict(_recipe_payload(rng), cuisine_type=cuisine, is_vegetarian=vegetarian)
+        created.append(client.post("/recipes/", json=payload).json())
+    return created
+
+def _names(client, **params):
+    response = client.get("/recipes/", params=params)
+    assert response.status_code == 200, response.text
+    return [recipe["name"] for recipe in response.json()]
+
+def test_cuisine_filter_is_exact_and_case_insensitive(client, recipes):
+    italian = [recipe["name"] for recipe in recipes[:2]]
+    assert _names(client, cuisine_type="italian") == italian
+    # LIKE wildcards in the value are matched literally
+    for pattern in ["%", "it_lian", "ital%", "*", "\\"]:
+        assert _names(client, cuisine_type=pattern) == []
+
+def test_is_vegetarian_is_stored_and_filtered(client, recipes):
+    assert [recipe["is_vegetarian"] for recipe in recipes] == [True, False, None]
+    assert _names(client, is_vegetarian="true") == [recipes[0]["name"]]
+    assert _names(client, is_vegetarian="false") == [recipes[1]["name"]]
+
+def test_category_filter_is_literal(client):
+    rng = random.Random(5)
+    client.post("/ingredients/", json=dict(_ingredient_payload(rng), category="Dairy"))
+    for category, found in [("dairy", 1), ("d_iry", 0), ("%", 0)]:
+        response = client.get("/ingredients/", params={"category": category})
+        assert len(response.json()) == found
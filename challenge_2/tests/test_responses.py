@@ -0,0 +1,39 @@
+import json
+import random
+import uuid
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models.schemas import Ingredient, RecipeSummary
+from app.utils.responses import dumps, ndjson_lines
+from benchmarks.bench_load import _ingredient_payload
+
+def test_dumps_matches_fastapi_with_and_without_exclude_unset():
+    ingredient = Ingredient(
+        id=1, user_id=uuid.uuid4(), name="Milk", quantity=1, unit="l", last_updated=datetime.now(timezone.utc)
+    )
+    summary = RecipeSummary(id=2, name="Omelette")
+    for model in (ingredient, summary):
+        assert json.loads(dumps(model)) == jsonable_encoder(model)
+        assert json.loads(dumps(model, exclude_unset=True)) == jsonable_encoder(model, exclude_unset=True)
+    assert "category" in json.loads(dumps(ingredient))
+    assert json.loads(ndjson_lines([summary], exclude_unset=True)) == {"id": 2, "name": "Omelette"}
+
+def test_ingredient_list_keeps_unset_fields(client):
+    payload = _ingredient_payload(random.Random(1))
+    del payload["category"], payload["expiry_date"]
+    client.post("/ingredients/", json=payload)
+
+    listed = client.get("/ingredients/").json()
+    streamed = client.get("/ingredients/", headers={"Accept": "application/x-ndjson"}).text.splitlines()
+    for row in (listed[0], json.loads(streamed[0])):
+        assert row["category"] is None and row["expiry_date"] is None
+
+def test_recipe_summaries_leave_out_unrequested_fields(client):
+    client.post("/recipes/", json={
+        "name": "Omelette", "instructions": "Whisk.",
+        "ingredients": [{"ingredient_name": "Egg", "quantity": 2, "unit": "pcs"}]
+    })
+    listed = client.get("/recipes/", params={"fields": "name"}).json()
+    assert listed == [{"id": listed[0]["id"], "name": "Omelette"}]
@@ -0,0 +1,50 @@
+"""PostgREST round trips per mutation, counted by the fake's request log"""
+import random
+
+from benchmarks.bench_load import _ingredient_payload, _recipe_payload
+
+def _requests(supabase, client, method: str, url: str, status: int = 200, **kwargs):
+    supabase.requests.clear()
+    response = client.request(method, url, **kwargs)
+    assert response.status_code == status, response.text
+    return list(supabase.requests), response
+
+def test_recipe_mutations(client, supabase):
+    payload = _recipe_payload(random.Random(7))
+    requests, response = _requests(supabase, client, "POST", "/recipes/", json=payload)
+    assert requests == [("POST", "recipes"), ("POST", "recipe_ingredients")]
+    url = f"/recipes/{response.json()['id']}"
+
+    # Ownership is checked by the write itself, and unchanged ingredients are left alone
+    requests, _ = _requests(supabase, client, "PUT", url, json=payload)
+    assert requests == [("PATCH", "recipes")]
+
+    payload["ingredients"] = payload["ingredients"][1:] + [
+        {"ingredient_name": "Salt", "quantity": 1, "unit": "g"}
+    ]
+    requests, response = _requests(supabase, client, "PUT", url, json=payload)
+    assert requests == [("PATCH", "recipes"), ("DELETE", "recipe_ingredients"), ("POST", "recipe_ingredients")]
+    assert [i["ingredient_name"] for i in response.json()["ingredients"]][-1] == "Salt"
+
+    requests, _ = _requests(supabase, client, "DELETE", url)
+    assert requests == [("DELETE", "recipes")]
+
+    requests, _ = _requests(supabase, client, "DELETE", url, status=404)
+    assert requests == [("DELETE", "recipes")]
+    requests, _ = _requests(supabase, client, "PUT", url, status=404, json=payload)
+    assert requests == [("PATCH", "recipes")]
+
+def test_ingredient_mutations(client, supabase):
+    rng = random.Random(7)
+    requests, response = _requests(supabase, client, "POST", "/ingredients/", json=_ingredient_payload(rng))
+    assert requests == [("POST", "ingredients")]
+    url = f"/ingredients/{response.json()['id']}"
+
+    requests, _ = _requests(supabase, client, "PUT", url, json=_ingredient_payload(rng))
+    assert requests == [("PATCH", "ingredients")]
+
+    requests, _ = _requests(supabase, client, "DELETE", url)
+    assert requests == [("DELETE", "ingredients")]
+
+    requests, _ = _requests(supabase, client, "DELETE", url, status=404)
+    assert requests == [("DELETE", "ingredients")]
@@ -0,0 +1,99 @@
+import random
+import re
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.expiry import expiring, prompt_ingredients
+from app.services.langchain_service import LangChainService, settings
+from app.utils import tokens
+from app.utils.tokens import estimate_tokens, fit_to_tokens, truncate_to_tokens
+from benchmarks.bench_prompt import MODEL, _pantry
+
+class _CharacterEncoding:
+    """One token per character, standing in for a tiktoken encoding"""
+
+    def encode(self, text, disallowed_special=()):
+        return [ord(character) for character in text]
+
+    def decode(self, ids):
+        return "".join(map(chr, ids))
+
+@pytest.fixture(params=["exact", "estimated"])
+def encoding(request, monkeypatch):
+    """Run a test with an encoding and with the offline four-characters estimate"""
+    encoding = _CharacterEncoding() if request.param == "exact" else None
+    monkeypatch.setattr(tokens, "encoding_for", lambda model_name: encoding)
+    return encoding
+
+# A cut text may overrun its budget by the " ..." marker
+MARKER = " ..."
+
+def test_estimate_tokens(encoding):
+    text = "twelve chars"
+    assert estimate_tokens(text, MODEL) == (12 if encoding else 3)
+    assert estimate_tokens("", MODEL) == 0
+
+def test_truncate_to_tokens(encoding):
+    text = " ".join(f"word{i}" for i in range(200))
+    assert truncate_to_tokens("short", 10, MODEL) == "short"
+    cut = truncate_to_tokens(text, 50, MODEL)
+    assert cut.endswith(MARKER)
+    assert text.startswith(cut[:-len(MARKER)] + " ")
+    assert estimate_tokens(cut, MODEL) <= 50 + estimate_tokens(MARKER, MODEL)
+
+def test_fit_to_tokens(encoding):
+    items = [f"ingredient {i}" for i in range(100)]
+    fitted = fit_to_tokens(items, 60, MODEL)
+    assert fitted == items[:len(fitted)]
+    assert 0 < len(fitted) < len(items)
+    assert estimate_tokens(", ".join(fitted), MODEL) <= 60
+    # Items are costed one by one, so the next one would have overrun
+    separator = estimate_tokens(", ", MODEL)
+    costs = [estimate_tokens(item, MODEL) for item in items[:len(fitted) + 1]]
+    assert sum(costs) + separator * len(fitted) > 60
+    assert fit_to_tokens(items[:3], 10**6, MODEL) == items[:3]
+    assert fit_to_tokens(items, 0, MODEL) == []
+
+def _part(prompt: str, label: str) -> str:
+    return re.search(rf"{label}: (.*)", prompt).group(1)
+
+@pytest.mark.parametrize("pantry_size", [300, 3_000])
+def test_suggestion_prompt_holds_parts_to_budgets(encoding, monkeypatch, pantry_size):
+    budgets = {"prompt_query_tokens": 40, "prompt_ingredient_tokens": 120, "prompt_recipe_tokens": 300}
+    # The prompt only needs the model name from the service
+    service = SimpleNamespace(recipe_llm=SimpleNamespace(model_name=MODEL))
+
+    rng = random.Random(pantry_size)
+    vocabulary = [f"ingredient {i}" for i in range(400)]
+    pantry = _pantry(rng, pantry_size, vocabulary)
+    words = "chop stir simmer season fold whisk bake rest serve garnish".split()
+    saved_recipes = [
+        f"Saved recipe {i}: " + " ".join(rng.choice(words) for _ in range(500)) for i in range(3)
+    ]
+    query = "Something warming for dinner with " + ", ".join(rng.sample(vocabulary, 5)) + " please" * 100
+    now = time.time()
+    available = prompt_ingredients(pantry, query, settings.prompt_max_ingredients, now)
+    expiring_names = [item.name for item in expiring(pantry, settings.expiry_horizon_days, now)]
+
+    # As the prompt was built before the budgets: every name, every recipe in full
+    for name in budgets:
+        monkeypatch.setattr(settings, name, 10**9)
+    unbudgeted = LangChainService._suggestion_prompt(
+        service, query, [item.name for item in pantry], saved_recipes
+    )
+    for name, budget in budgets.items():
+        monkeypatch.setattr(settings, name, budget)
+    prompt = LangChainService._suggestion_prompt(service, query, available, saved_recipes, expiring_names)
+
+    marker = estimate_tokens(MARKER, MODEL)
+    kept = _part(prompt, "available ingredients")
+    assert estimate_tokens(kept, MODEL) <= settings.prompt_ingredient_tokens
+    assert 0 < len(kept.split(", ")) < len(available)
+    assert estimate_tokens(_part(prompt, "the user's request"), MODEL) <= settings.prompt_query_tokens + marker
+    recipes = re.findall(r"^\s+- (Saved recipe .*)$", prompt, re.MULTILINE)
+    assert len(recipes) == 3
+    share = settings.prompt_recipe_tokens // 3
+    assert all(estimate_tokens(recipe, MODEL) <= share + marker for recipe in recipes)
+    assert estimate_tokens(prompt, MODEL) < estimate_tokens(unbudgeted, MODEL) / 3
@@ -0,0 +1,12 @@
+import pytest
+
+from app.utils.uploads import _too_large
+
+@pytest.mark.parametrize("limit, shown", [
+    (20 * 1024 * 1024, "20"),
+    (1536 * 1024, "1.5"),
+    (512 * 1024, "0.5"),
+    (1000, "0.000954")
+])
+def test_limit_is_shown_in_megabytes(limit, shown):
+    assert _too_large(limit) == f"Upload exceeds the {shown} MB limit"
@@ -0,0 +1,33 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+from app.models.schemas import Recipe, RecipeIngredientBase
+from app.services.vector_store import RecipeVectorStore
+
+USER_ID = str(uuid.uuid4())
+
+def _recipe(recipe_id: int, name: str) -> Recipe:
+    return Recipe(
+        id=recipe_id, user_id=USER_ID, name=name, instructions="Cook it.",
+        ingredients=[RecipeIngredientBase(ingredient_name="Egg", quantity=2, unit="pcs")],
+        average_rating=0, number_of_reviews=0, vector_store_id=str(uuid.uuid4()),
+        created_at=datetime.now(timezone.utc)
+    )
+
+def test_backfill_embeds_older_recipes_of_users_with_documents(tmp_path):
+    store = RecipeVectorStore(path=str(tmp_path), batch_size=2)
+    older = [_recipe(1, "Omelette"), _recipe(2, "Frittata"), _recipe(3, "Shakshuka")]
+    newest = _recipe(4, "Egg fried rice")
+
+    async def scenario():
+        # A recipe saved after retrieval shipped must not hide the older ones
+        await store.add_recipes([newest], USER_ID)
+        assert not store.is_backfilled(USER_ID)
+        assert await store.backfill(older + [newest], USER_ID) == 3
+        assert store.is_backfilled(USER_ID)
+        return await store.find_similar(USER_ID, "shakshuka", k=4)
+
+    matches = asyncio.run(scenario())
+    assert {match["recipe_id"] for match in matches} == {1, 2, 3, 4}
+    assert store.indexed_ids(USER_ID) == {recipe.vector_store_id for recipe in older + [newest]}